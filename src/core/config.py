@@ -6,9 +6,12 @@ This version includes robust, multi-location credential finding and explicit
 credentials object loading for reliable authentication in any environment.
 """
 
+import copy
 import os
 from dataclasses import dataclass, field
-from typing import List, Dict, Optional
+from functools import lru_cache
+from types import MappingProxyType
+from typing import List, Dict, Mapping, Optional, Tuple
 from pathlib import Path
 
 # Importaciones necesarias para la carga de credenciales
@@ -16,6 +19,23 @@ from google.oauth2 import service_account
 from google.auth.credentials import Credentials
 from loguru import logger
 
+WRITE_STRATEGIES = ("delete_append", "partition_truncate", "merge")
+
+
+def _parse_clustering_fields(raw: str) -> Dict[str, List[str]]:
+    """Parses CLUSTERING_FIELDS, e.g. 'agregada:CARTERA,CANAL,OPERADOR;primera_vez:CARTERA,cliente'."""
+    clustering_fields = {}
+    for entry in filter(None, (part.strip() for part in raw.split(";"))):
+        table_type, _, columns = entry.partition(":")
+        clustering_fields[table_type.strip()] = [col.strip() for col in columns.split(",") if col.strip()]
+    return clustering_fields
+
+
+def _freeze_clustering_fields(clustering_fields: Mapping[str, List[str]]) -> Mapping[str, Tuple[str, ...]]:
+    """Read-only view of the clustering overrides, so copies of a config can share it safely."""
+    return MappingProxyType({table_type: tuple(columns) for table_type, columns in clustering_fields.items()})
+
+
 def _is_docker_environment() -> bool:
     """Detects if the script is running inside a Docker container."""
     return os.path.exists('/.dockerenv') or os.getenv('DOCKER_ENV') == 'true'
@@ -43,10 +63,26 @@ class ETLConfig:
     # --- Output Configuration ---
     output_table_prefix: str = field(default_factory=lambda: os.getenv("OUTPUT_TABLE_PREFIX", "dash_cobranza"))
     overwrite_tables: bool = field(default_factory=lambda: os.getenv("OVERWRITE_TABLES", "true").lower() == "true")
+    # How overwrite_tables is enforced: "delete_append" (DELETE month + APPEND),
+    # "partition_truncate" (WRITE_TRUNCATE of each loaded day partition via table$YYYYMMDD)
+    # or "merge" (staging table + MERGE on each table's natural key)
+    write_strategy: str = field(default_factory=lambda: os.getenv("WRITE_STRATEGY", "delete_append").lower())
+    # Clustering column overrides per table type (low → high cardinality), see _parse_clustering_fields
+    clustering_fields: Mapping[str, Tuple[str, ...]] = field(
+        default_factory=lambda: _parse_clustering_fields(os.getenv("CLUSTERING_FIELDS", ""))
+    )
+    # Daily materialized view over the agregada table for Looker Studio dashboards
+    create_materialized_views: bool = field(default_factory=lambda: os.getenv("CREATE_MATERIALIZED_VIEWS", "false").lower() == "true")
+    # Append through the BigQuery Storage Write API instead of load jobs (needs google-cloud-bigquery-storage)
+    use_storage_write_api: bool = field(default_factory=lambda: os.getenv("USE_STORAGE_WRITE_API", "false").lower() == "true")
 
     # --- Performance ---
     batch_size: int = field(default_factory=lambda: int(os.getenv("BATCH_SIZE", "10000")))
     max_workers: int = field(default_factory=lambda: int(os.getenv("MAX_WORKERS", "4")))
+    # Parallel queries per gestiones batch, split by MOD(ABS(cod_luna), n)
+    gestiones_shards: int = field(default_factory=lambda: int(os.getenv("GESTIONES_SHARDS", "1")))
+    # Staged rows (all tables) that trigger a load mid-run, so a failed load only loses its own batch
+    staging_max_rows: int = field(default_factory=lambda: int(os.getenv("STAGING_MAX_ROWS", "500000")))
 
     # --- Logging ---
     log_level: str = field(default_factory=lambda: os.getenv("LOG_LEVEL", "INFO").upper())
@@ -62,6 +98,9 @@ class ETLConfig:
     def __post_init__(self):
         """Initializes paths and credentials object after the main object is created."""
 
+        # 0. Immutable clustering overrides (shared by the shallow copies from get_config)
+        self.clustering_fields = _freeze_clustering_fields(self.clustering_fields)
+
         # 1. Find and Load Credentials
         self.credentials_path = self._find_credentials_path()
         self.credentials_object = None
@@ -133,13 +172,47 @@ class ETLConfig:
         except (ValueError, AttributeError):
             raise ValueError(f"mes_vigencia '{self.mes_vigencia}' is invalid. Must be in YYYY-MM format.")
 
+        if self.write_strategy not in WRITE_STRATEGIES:
+            raise ValueError(f"write_strategy '{self.write_strategy}' is invalid. Must be one of {WRITE_STRATEGIES}.")
+
+        if self.gestiones_shards < 1:
+            raise ValueError(f"gestiones_shards must be >= 1, got {self.gestiones_shards}.")
+        if self.staging_max_rows < 1:
+            raise ValueError(f"staging_max_rows must be >= 1, got {self.staging_max_rows}.")
+
+        for table_type, columns in self.clustering_fields.items():
+            if table_type not in self.output_tables:
+                raise ValueError(f"clustering_fields has unknown table type '{table_type}'. Must be one of {list(self.output_tables)}.")
+            if not 0 < len(columns) <= 4:
+                raise ValueError(f"clustering_fields for '{table_type}' must have between 1 and 4 columns.")
+
         logger.trace("Configuration validated successfully.")
 
+@lru_cache(maxsize=1)
+def _load_config() -> ETLConfig:
+    """Builds the environment-derived configuration (env vars, credentials file) once per process."""
+    return ETLConfig()
+
+
 def get_config(**overrides) -> ETLConfig:
-    """Factory function to get a validated configuration instance."""
-    config = ETLConfig()
+    """
+    Factory function to get a validated configuration instance.
+
+    Returns a shallow copy of the cached configuration, so callers can set attributes
+    without affecting each other; its only container field (clustering_fields) is
+    read-only. Call reset_config() after changing the environment.
+    """
+    config = copy.copy(_load_config())
     for key, value in overrides.items():
         if hasattr(config, key) and value is not None:
+            if key == 'clustering_fields':
+                value = _freeze_clustering_fields(value)
             setattr(config, key, value)
     config.validate()
-    return config
\ No newline at end of file
+    return config
+
+
+
+def reset_config() -> None:
+    """Drops the cached configuration, so the next get_config() re-reads the environment."""
+    _load_config.cache_clear()
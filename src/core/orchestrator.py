@@ -52,12 +52,13 @@ class ETLOrchestrator:
             from etl.extractor import BigQueryExtractor
             from etl.business_days import BusinessDaysProcessor
             from etl.transformer import CobranzaTransformer
-            from etl.loader import BigQueryLoader
+            from etl.loader import BigQueryLoader, StorageWriteLoader
 
             self._extractor = BigQueryExtractor(self.config)
             self._business_days = BusinessDaysProcessor(self.config)
             self._transformer = CobranzaTransformer(self.config, self._business_days)
-            self._loader = BigQueryLoader(self.config)
+            loader_cls = StorageWriteLoader if self.config.use_storage_write_api else BigQueryLoader
+            self._loader = loader_cls(self.config)
 
             logger.info("✅ Componentes ETL reales inicializados.")
             return True
@@ -101,16 +102,21 @@ class ETLOrchestrator:
         df_deuda_contexto = self._extractor.extract_contexto_deuda(fechas_trandeuda)
 
         if not df_deuda_contexto.empty:
-            nros_documento_unicos = df_deuda_contexto['nro_documento'].unique().tolist()
+            nros_documento_unicos = df_deuda_contexto['nro_documento'].dropna().unique()
             df_pagos_contexto = self._extractor.extract_contexto_pagos(nros_documento_unicos)
         else:
             df_pagos_contexto = pd.DataFrame()
 
-        # 3. Clean Target Tables
-        if self.config.overwrite_tables:
+        # 3. Clean Target Tables (partition_truncate and merge replace data at load time instead)
+        partition_truncate = self.config.overwrite_tables and self.config.write_strategy == 'partition_truncate'
+        if self.config.overwrite_tables and self.config.write_strategy == 'delete_append':
             self._loader.clear_tables_for_month()
 
-        total_records_processed, failed_files = 0, []
+        write_disposition = (
+            bigquery.WriteDisposition.WRITE_TRUNCATE if partition_truncate
+            else bigquery.WriteDisposition.WRITE_APPEND
+        )
+        total_records_processed, failed_files, load_results = 0, [], {}
 
         # 4. Main Granular Processing Loop
         for index, periodo in df_calendario.iterrows():
@@ -137,35 +143,60 @@ class ETLOrchestrator:
                 # 4c. TRANSFORM the data package for this period
                 transformed_data_periodo = self._transformer.transform_all_data(raw_data_periodo)
 
-                # 4d. LOAD data for this period in APPEND mode
+                # 4d. STAGE data for this period; it is loaded once per table after the loop
                 if any(not df.empty for df in transformed_data_periodo.values()):
-                    logger.info(f"  -> Cargando datos transformados de '{archivo_actual}'...")
-                    self._loader.load_all_tables(
-                        transformed_data_periodo,
-                        write_disposition=bigquery.WriteDisposition.WRITE_APPEND
-                    )
+                    for table_name, df in transformed_data_periodo.items():
+                        self._loader.stage_dataframe(df, table_name)
                     records_in_period = sum(len(df) for df in transformed_data_periodo.values())
                     total_records_processed += records_in_period
-                    logger.success(f"✅ Archivo '{archivo_actual}' procesado y cargado ({records_in_period:,} registros).")
+                    logger.success(f"✅ Archivo '{archivo_actual}' procesado y preparado para carga ({records_in_period:,} registros).")
+                    # Staging acotado: se carga por lotes para no perder todo ante un fallo al final
+                    if self._loader.staging_full():
+                        self._accumulate_load_results(load_results, self._loader.flush(write_disposition=write_disposition))
             except Exception as e:
                 logger.exception(f"❌ Error fatal procesando el archivo '{archivo_actual}'. Saltando al siguiente.")
                 failed_files.append(archivo_actual)
                 continue
 
-        # 5. Finalization and Reporting
-        execution_time = str(datetime.now() - start_time)
+        # 5. LOAD the remaining staged shards (one load job per table, or per day partition)
         logger.info("--- 🏁 Fin del procesamiento de todos los archivos. ---")
+        self._accumulate_load_results(load_results, self._loader.flush(write_disposition=write_disposition))
+        failed_tables = [table for table, result in load_results.items() if result.get('status') == 'ERROR']
+        if failed_tables:
+            logger.error(f"❌ Falló la carga de {len(failed_tables)} tabla(s): {failed_tables}")
+
+        # 6. Finalization and Reporting
+        execution_time = str(datetime.now() - start_time)
         if not self.config.dry_run:
+            self._loader.create_table_descriptions()
             self._loader.optimize_for_looker_studio()
+            if self.config.create_materialized_views:
+                self._loader.create_materialized_views()
         if failed_files:
             logger.error(f"❌ {len(failed_files)} archivos fallaron: {failed_files}")
 
+        if failed_tables:
+            error_message = f"{len(failed_tables)} tablas no se pudieron cargar"
+        elif failed_files:
+            error_message = f"{len(failed_files)} archivos fallaron"
+        else:
+            error_message = "Proceso completado."
+
         return ETLResult(
-            success=not failed_files,
+            success=not failed_files and not failed_tables,
             records_processed=total_records_processed,
             files_processed=len(df_calendario) - len(failed_files),
             files_failed=len(failed_files),
             execution_time=execution_time,
             output_tables=list(self.config.output_tables.values()),
-            error_message=f"{len(failed_files)} archivos fallaron" if failed_files else "Proceso completado."
-        )
\ No newline at end of file
+            error_message=error_message
+        )
+    @staticmethod
+    def _accumulate_load_results(totals: Dict[str, Dict], results: Dict[str, Dict]) -> None:
+        """Adds one flush's per-table results to the run totals; a table stays ERROR once any flush failed."""
+        for table_name, result in results.items():
+            total = totals.setdefault(table_name, {'status': result.get('status'), 'rows_written': 0})
+            total['rows_written'] += result.get('rows_written', 0)
+            if result.get('status') == 'ERROR':
+                total['status'] = 'ERROR'
+                total.setdefault('error', result.get('error'))
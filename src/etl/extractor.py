@@ -6,9 +6,12 @@ paginación para grandes volúmenes de datos y manejo explícito de credenciales
 """
 
 import re
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from typing import Dict, List, Optional, Tuple, Any
+from typing import Dict, List, Optional, Sequence, Tuple, Any, Union
 
 from google.cloud import bigquery
 from google.api_core.exceptions import GoogleAPICallError
@@ -17,6 +20,29 @@ from loguru import logger
 from core.config import ETLConfig
 from .queries import QUERIES
 
+# Mantiene los enteros/booleanos anulables igual que to_dataframe() al convertir desde Arrow;
+# los textos quedan respaldados por los buffers Arrow en vez de copiarse a arrays de objetos Python
+_ARROW_TO_PANDAS_TYPES = {
+    pa.int64(): pd.Int64Dtype(),
+    pa.bool_(): pd.BooleanDtype(),
+    pa.string(): pd.StringDtype('pyarrow'),
+    pa.large_string(): pd.StringDtype('pyarrow'),
+}
+
+# Columnas de asignación con pocos valores distintos: se codifican como diccionario Arrow
+# (pd.Categorical en pandas) para guardar un código entero por fila en vez de un texto
+_ASIGNACION_DICTIONARY_COLUMNS = ('tramo_gestion', 'archivo', 'negocio', 'fraccionamiento', 'tipo_linea')
+
+
+def _arrow_to_pandas(table: pa.Table, dictionary_columns: Sequence[str] = ()) -> pd.DataFrame:
+    """Convierte una tabla Arrow a pandas, codificando como diccionario las columnas indicadas."""
+    for name in dictionary_columns:
+        index = table.schema.get_field_index(name)
+        if index >= 0 and pa.types.is_string(table.schema.field(index).type):
+            table = table.set_column(index, name, table.column(index).dictionary_encode())
+    # split_blocks + self_destruct: cada columna se libera de Arrow al pasar a pandas
+    return table.to_pandas(types_mapper=_ARROW_TO_PANDAS_TYPES.get, split_blocks=True, self_destruct=True)
+
 
 class BigQueryExtractor:
     """Extrae datos de BigQuery con lógica de negocio y validación."""
@@ -28,17 +54,36 @@ class BigQueryExtractor:
             credentials=config.credentials_object
         )
         self.dataset_id = f"{config.project_id}.{config.dataset_id}"
+        self.bqstorage_client = self._create_bqstorage_client()
         logger.info(f"🔌 BigQuery Extractor inicializado para dataset: {self.dataset_id}")
 
-    def _execute_query(self, query_template: str, params: List, job_id_prefix: str) -> pd.DataFrame:
-        """Ejecuta una consulta parametrizada y maneja los errores."""
+    def _create_bqstorage_client(self):
+        """Crea un único cliente de la Storage Read API (Arrow por gRPC), si está instalado."""
+        try:
+            from google.cloud import bigquery_storage
+        except ImportError:
+            logger.debug("google-cloud-bigquery-storage no instalado: los resultados se descargan vía REST.")
+            return None
+        return bigquery_storage.BigQueryReadClient(credentials=self.config.credentials_object)
+
+    def _execute_query(self, query_template: str, params: List, job_id_prefix: str,
+                       as_arrow: bool = False) -> Union[pd.DataFrame, pa.Table]:
+        """Ejecuta una consulta parametrizada y maneja los errores.
+
+        Con ``as_arrow=True`` devuelve el resultado como ``pyarrow.Table`` sin pasar por pandas.
+        """
         query = query_template.format(dataset=self.dataset_id)
         job_config = bigquery.QueryJobConfig(query_parameters=params)
         full_job_id_prefix = f"faco_{job_id_prefix}_"
 
         try:
-            df = self.client.query(query, job_config=job_config, job_id_prefix=full_job_id_prefix).to_dataframe()
-            return df
+            job = self.client.query(query, job_config=job_config, job_id_prefix=full_job_id_prefix)
+            # Resultados vía Storage Read API en Arrow columnar cuando el cliente está disponible;
+            # el DataFrame se arma desde esa misma tabla con la conversión de _paginated_extraction
+            table = job.to_arrow(bqstorage_client=self.bqstorage_client)
+            if as_arrow:
+                return table
+            return _arrow_to_pandas(table)
         except GoogleAPICallError as e:
             logger.error(f"❌ Error en la API de BigQuery [Job Prefix: {full_job_id_prefix}]: {e.message}")
             raise
@@ -60,38 +105,64 @@ class BigQueryExtractor:
         """Extrae los datos del calendario para el período configurado."""
         logger.info(f"📅 Extrayendo calendario para {self.config.mes_vigencia} - {self.config.estado_vigencia}")
         params = [
-            bigquery.ScalarQueryParameter("mes_vigencia", "STRING", f"{self.config.mes_vigencia}-01"),
+            bigquery.ScalarQueryParameter("mes_vigencia", "DATE", f"{self.config.mes_vigencia}-01"),
             bigquery.ScalarQueryParameter("estado_vigencia", "STRING", self.config.estado_vigencia),
         ]
         df = self._execute_query(QUERIES['get_calendario'], params, "calendario")
         logger.info(f"✅ Calendario extraído: {len(df)} períodos encontrados.")
         return df
 
-    def _paginated_extraction(self, query_name: str, ids: List[Any], id_type: str, id_key: str, **extra_params) -> pd.DataFrame:
-        """Extrae datos en lotes para listas largas de IDs."""
-        if not ids:
+    def _paginated_extraction(self, query_name: str, ids: Sequence[Any], id_type: str, id_key: str,
+                              extra_params: Sequence[bigquery.ScalarQueryParameter] = (),
+                              n_shards: Optional[int] = None) -> pd.DataFrame:
+        """Extrae datos en lotes para listas (o arrays NumPy) largas de IDs.
+
+        Los lotes (y, con ``n_shards``, los shards ``MOD(id, n_shards)`` de cada lote) son
+        jobs independientes y se ejecutan en paralelo con hasta ``max_workers`` hilos.
+        """
+        if len(ids) == 0:
             return pd.DataFrame()
-        all_dfs = []
+        job_params = []
         for i in range(0, len(ids), self.config.batch_size):
             batch_ids = ids[i:i + self.config.batch_size]
             logger.debug(f"  - Procesando lote para '{query_name}' ({i//self.config.batch_size + 1}), {len(batch_ids)} IDs.")
-            params = [bigquery.ArrayQueryParameter(id_key, id_type, batch_ids)]
-            for key, value in extra_params.items():
-                params.append(bigquery.ScalarQueryParameter(key, "STRING", value))
-            df_batch = self._execute_query(QUERIES[query_name], params, f"{query_name}_batch")
-            all_dfs.append(df_batch)
-        return pd.concat(all_dfs, ignore_index=True) if all_dfs else pd.DataFrame()
-
-    def extract_gestiones_by_period(self, cod_lunas: List[int], fecha_inicio: pd.Timestamp, fecha_fin: pd.Timestamp) -> Tuple[pd.DataFrame, pd.DataFrame]:
+            # La API de parámetros requiere tipos nativos de Python: se convierte solo en este borde
+            # (arrays NumPy o columnas Arrow, p. ej. los nro_documento únicos de la deuda)
+            if hasattr(batch_ids, 'tolist'):
+                batch_ids = batch_ids.tolist()
+            params = [bigquery.ArrayQueryParameter(id_key, id_type, batch_ids), *extra_params]
+            if n_shards is None:
+                job_params.append(params)
+                continue
+            for shard in range(n_shards):
+                job_params.append(params + [
+                    bigquery.ScalarQueryParameter("n_shards", "INT64", n_shards),
+                    bigquery.ScalarQueryParameter("shard", "INT64", shard),
+                ])
+
+        with ThreadPoolExecutor(max_workers=min(self.config.max_workers, len(job_params))) as executor:
+            batch_tables = list(executor.map(
+                lambda params: self._execute_query(QUERIES[query_name], params, f"{query_name}_batch", as_arrow=True),
+                job_params
+            ))
+
+        # Los lotes comparten esquema: concat_tables solo encadena chunks (sin copia) y la
+        # conversión a pandas asigna cada columna una sola vez, en vez de pd.concat sobre N DataFrames.
+        combined = pa.concat_tables(batch_tables)
+        del batch_tables
+        return _arrow_to_pandas(combined)
+
+    def extract_gestiones_by_period(self, cod_lunas: Sequence[int], fecha_inicio: pd.Timestamp, fecha_fin: pd.Timestamp) -> Tuple[pd.DataFrame, pd.DataFrame]:
         """Extrae gestiones de BOT y HUMANAS usando paginación."""
-        if not cod_lunas:
+        if len(cod_lunas) == 0:
             return pd.DataFrame(), pd.DataFrame()
-        params = {
-            'fecha_inicio': fecha_inicio.strftime('%Y-%m-%d'),
-            'fecha_fin': fecha_fin.strftime('%Y-%m-%d')
-        }
-        df_bot = self._paginated_extraction('get_gestiones_bot', cod_lunas, "INT64", "cod_lunas", **params)
-        df_humano = self._paginated_extraction('get_gestiones_humano', cod_lunas, "INT64", "cod_lunas", **params)
+        params = [
+            bigquery.ScalarQueryParameter("fecha_inicio", "DATE", fecha_inicio.date()),
+            bigquery.ScalarQueryParameter("fecha_fin", "DATE", fecha_fin.date()),
+        ]
+        n_shards = self.config.gestiones_shards
+        df_bot = self._paginated_extraction('get_gestiones_bot', cod_lunas, "INT64", "cod_lunas", params, n_shards)
+        df_humano = self._paginated_extraction('get_gestiones_humano', cod_lunas, "INT64", "cod_lunas", params, n_shards)
         return df_bot, df_humano
 
     def _extract_date_from_filename(self, filename: str) -> Optional[datetime]:
@@ -131,9 +202,9 @@ class BigQueryExtractor:
         logger.info(f"  -> ✅ Deuda total extraída: {len(df_deuda):,} registros.")
         return df_deuda
 
-    def extract_contexto_pagos(self, nros_documento: List[str]) -> pd.DataFrame:
+    def extract_contexto_pagos(self, nros_documento: Sequence[str]) -> pd.DataFrame:
         """Extrae todos los pagos para una lista de números de documento."""
-        if not nros_documento:
+        if len(nros_documento) == 0:
             logger.warning("⚠️ No hay números de documento para buscar pagos.")
             return pd.DataFrame()
 
@@ -152,12 +223,23 @@ class BigQueryExtractor:
         # 1. Asignación
         archivos_txt = [f"{archivo}.txt"]
         params = [bigquery.ArrayQueryParameter("archivos", "STRING", archivos_txt)]
-        df_asignacion = self._execute_query(QUERIES['get_asignacion'], params, "asignacion_periodo")
+        df_asignacion = _arrow_to_pandas(
+            self._execute_query(QUERIES['get_asignacion'], params, "asignacion_periodo", as_arrow=True),
+            _ASIGNACION_DICTIONARY_COLUMNS
+        )
+        if not df_asignacion.empty:
+            logger.info(
+                f"  -> Asignación: {len(df_asignacion):,} registros, "
+                f"~{int(df_asignacion['_n_cuenta'].iat[0]):,} cuentas, "
+                f"~{int(df_asignacion['_n_cod_luna'].iat[0]):,} cod_luna únicos"
+            )
+        df_asignacion.drop(columns=['_n_cuenta', '_n_cod_luna'], inplace=True, errors='ignore')
         data['asignacion'] = df_asignacion
 
         # 2. Gestiones
         if not df_asignacion.empty:
-            cod_lunas_unicos = df_asignacion['cod_luna'].unique().tolist()
+            # Único + ordenado en C sobre un ndarray int64, sin materializar ints de Python
+            cod_lunas_unicos = np.unique(df_asignacion['cod_luna'].dropna().to_numpy(dtype=np.int64))
             fecha_inicio = pd.to_datetime(calendario_periodo['FECHA_ASIGNACION'])
             fecha_cierre = pd.to_datetime(calendario_periodo['FECHA_CIERRE'])
             if pd.isna(fecha_cierre):
@@ -2,19 +2,105 @@
 BigQuery Loader for FACO ETL
 
 Handles optimized loading of transformed data to BigQuery.
-Supports granular, append-only loading for resilient, file-by-file processing.
+Per-file shards are staged in memory and loaded in bounded batches (STAGING_MAX_ROWS),
+so a failed load only affects the files staged since the previous flush.
 """
 
-import pandas as pd
-from datetime import datetime
-from typing import Dict, List, Any
+import uuid
 
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field, replace
+from datetime import date, datetime
+from typing import Dict, List, Any, Optional, Tuple
+
+from google.api_core.exceptions import NotFound
 from google.cloud import bigquery
 from google.cloud.bigquery import TimePartitioning
 from loguru import logger
 
 from core.config import ETLConfig
 
+# BigQuery admite como máximo 4 columnas de clustering por tabla
+MAX_CLUSTERING_FIELDS = 4
+
+# Dtype de pandas para dimensiones de texto repetitivas: diccionario Arrow de extremo a extremo
+_ARROW_DICTIONARY_STRING = pd.ArrowDtype(pa.dictionary(pa.int32(), pa.string()))
+
+# Máximo de jobs de carga por partición ($YYYYMMDD) para un shard; por encima se usa DELETE + APPEND
+MAX_PARTITION_LOAD_JOBS = 62
+
+# Filas por AppendRowsRequest en la Storage Write API (cada request admite hasta 10 MB)
+STORAGE_WRITE_BATCH_ROWS = 20_000
+
+# Day-level date columns loaded as DATE in every table that carries them (besides the partition field)
+_DATE_COLUMNS = ('FECHA_SERVICIO',)
+
+# Arrow type used for columns that Arrow cannot type on its own (all-null columns)
+_BQ_TO_ARROW_TYPES = {
+    "STRING": pa.string(),
+    "INTEGER": pa.int64(),
+    "FLOAT": pa.float64(),
+    "BOOLEAN": pa.bool_(),
+    "DATE": pa.date32(),
+    "DATETIME": pa.timestamp("us"),
+    "TIMESTAMP": pa.timestamp("us", tz="UTC"),
+    "NUMERIC": pa.decimal128(38, 9),
+}
+
+
+def _bq_type_for(arrow_type: pa.DataType) -> str:
+    """Maps an Arrow column type to the BigQuery type it loads as from Parquet."""
+    if pa.types.is_dictionary(arrow_type):
+        arrow_type = arrow_type.value_type
+    if pa.types.is_boolean(arrow_type):
+        return "BOOLEAN"
+    if pa.types.is_integer(arrow_type):
+        return "INTEGER"
+    if pa.types.is_floating(arrow_type):
+        return "FLOAT"
+    if pa.types.is_timestamp(arrow_type):
+        return "TIMESTAMP" if arrow_type.tz else "DATETIME"
+    if pa.types.is_date(arrow_type):
+        return "DATE"
+    if pa.types.is_decimal(arrow_type):
+        return "NUMERIC"
+    if pa.types.is_binary(arrow_type) or pa.types.is_large_binary(arrow_type):
+        return "BYTES"
+    # Strings y columnas sin tipo (todo nulos)
+    return "STRING"
+
+
+def _natural_key_hashes(df: pd.DataFrame, keys: List[str]) -> np.ndarray:
+    """
+    Hashes each row's natural key by value (categorical codes and dtypes do not matter),
+    so keys from shards loaded at different times can be compared. NULL keys hash equal,
+    like the null-safe MERGE condition.
+    """
+    return pd.util.hash_pandas_object(df[keys], index=False).to_numpy()
+
+
+@dataclass(frozen=True)
+class TableSpec:
+    """Immutable load settings for an output table, including its prebuilt TimePartitioning and clustering Index."""
+    partition_field: str
+    clustering_fields: Tuple[str, ...]
+    description: str
+    # Natural key used by the "merge" write strategy
+    merge_keys: Tuple[str, ...] = ()
+    time_partitioning: TimePartitioning = field(init=False, repr=False, compare=False)
+    clustering_index: pd.Index = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        object.__setattr__(
+            self, 'time_partitioning',
+            TimePartitioning(type_=bigquery.TimePartitioningType.DAY, field=self.partition_field)
+        )
+        object.__setattr__(self, 'clustering_index', pd.Index(self.clustering_fields))
+
 
 class BigQueryLoader:
     """Load transformed data to BigQuery with optimization for Looker Studio"""
@@ -26,30 +112,61 @@ class BigQueryLoader:
             credentials=config.credentials_object
         )
         self.dataset = f"{config.project_id}.{config.dataset_id}"
-
-        # Centralized configuration for output tables
-        self.table_configs = {
-            'agregada': {
-                'partition_field': 'FECHA_SERVICIO',
-                'clustering_fields': ['CARTERA', 'CANAL', 'OPERADOR'],
-                'description': 'Tabla principal agregada con métricas de gestión de cobranza.'
-            },
-            'comparativas': {
-                'partition_field': 'fecha_actual',
-                'clustering_fields': ['CARTERA', 'CANAL'],
-                'description': 'Comparativas período-sobre-período usando mismo día hábil.'
-            },
-            'primera_vez': {
-                'partition_field': 'FECHA_SERVICIO',
-                'clustering_fields': ['CARTERA', 'CANAL', 'cliente'],
-                'description': 'Tracking de primera interacción por cliente y dimensión.'
-            },
-            'base_cartera': {
-                'partition_field': 'FECHA_ASIGNACION',
-                'clustering_fields': ['CARTERA', 'MOVIL_FIJA'],
-                'description': 'Métricas base de cartera sin gestiones para análisis de cobertura.'
-            }
+        # config.output_tables rebuilds its dict on every access: resolve names and ids once
+        self.output_tables = config.output_tables
+        self._table_ids = {key: f"{self.dataset}.{name}" for key, name in self.output_tables.items()}
+
+        # Centralized configuration for output tables, built once per loader
+        self._table_specs: Dict[str, TableSpec] = {
+            'agregada': TableSpec(
+                partition_field='FECHA_SERVICIO',
+                clustering_fields=('CARTERA', 'CANAL', 'GRUPO_RESPUESTA', 'OPERADOR'),
+                description='Tabla principal agregada para dashboards de Looker Studio con métricas de gestión de cobranza.',
+                merge_keys=(
+                    'FECHA_SERVICIO', 'CARTERA', 'VENCIMIENTO', 'FECHA_ASIGNACION', 'FECHA_INICIO_GESTION',
+                    'FECHA_CIERRE', 'OBJ_RECUPERO', 'GRUPO_RESPUESTA', 'GLOSA_RESPUESTA', 'CANAL',
+                    'OPERADOR', 'NIVEL_1', 'NIVEL_2', 'NIVEL_3', 'SERVICIO'
+                )
+            ),
+            'comparativas': TableSpec(
+                partition_field='fecha_actual',
+                clustering_fields=('CARTERA', 'CANAL'),
+                description='Tabla de comparativas período-sobre-período usando lógica de mismo día hábil.',
+                merge_keys=(
+                    'fecha_actual', 'CARTERA', 'VENCIMIENTO', 'FECHA_ASIGNACION', 'FECHA_INICIO_GESTION',
+                    'FECHA_CIERRE', 'OBJ_RECUPERO', 'GRUPO_RESPUESTA', 'GLOSA_RESPUESTA', 'CANAL',
+                    'OPERADOR', 'NIVEL_1', 'NIVEL_2', 'NIVEL_3', 'SERVICIO'
+                )
+            ),
+            'primera_vez': TableSpec(
+                partition_field='FECHA_SERVICIO',
+                clustering_fields=('CARTERA', 'CANAL', 'cliente'),
+                description='Tabla de tracking de primera interacción por cliente y dimensión.',
+                merge_keys=('cliente', 'FECHA_SERVICIO', 'CARTERA', 'CANAL', 'OPERADOR', 'GRUPO_RESPUESTA')
+            ),
+            'base_cartera': TableSpec(
+                partition_field='FECHA_ASIGNACION',
+                clustering_fields=('CARTERA', 'MOVIL_FIJA'),
+                description='Métricas base de cartera sin gestiones para análisis de cobertura.',
+                merge_keys=('CARTERA', 'FECHA_ASIGNACION', 'SERVICIO')
+            ),
         }
+        # Clustering overrides from the config are used verbatim, without reordering
+        for table_name, clustering_fields in config.clustering_fields.items():
+            self._table_specs[table_name] = replace(
+                self._table_specs[table_name], clustering_fields=tuple(clustering_fields)
+            )
+        # Explicit load schema per output table, derived once from the first shard's dtypes
+        self._schema_cache: Dict[str, List[bigquery.SchemaField]] = {}
+        # Per-file shards accumulated by stage_dataframe() until flush()
+        self._staging: Dict[str, List[pd.DataFrame]] = {}
+        self._staged_rows = 0
+        # Day partitions ($YYYYMMDD) already replaced in this run: later flushes append to them
+        self._replaced_partitions: Dict[str, set] = {}
+        # Tables whose clustering order is already fixed for this run
+        self._clustering_resolved: set = set()
+        # Natural key hashes already merged per table in this run, to detect cross-file collisions
+        self._merged_keys: Dict[str, np.ndarray] = {}
         logger.info(f"💾 BigQuery Loader inicializado - Dataset: {self.dataset}")
 
     def clear_tables_for_month(self):
@@ -62,95 +179,485 @@ class BigQueryLoader:
             return
 
         logger.warning(f"🧹 Limpiando datos del mes {self.config.mes_vigencia} de las tablas de destino...")
-        month_start_date = f"{self.config.mes_vigencia}-01"
+        month_start_date = date.fromisoformat(f"{self.config.mes_vigencia}-01")
 
-        for table_key, config in self.table_configs.items():
-            table_name = self.config.output_tables.get(table_key)
+        partitioned_tables = {}
+        for table_key, spec in self._table_specs.items():
+            table_name = self.output_tables.get(table_key)
             if not table_name:
                 continue
-
-            full_table_id = f"{self.dataset}.{table_name}"
-            partition_field = config.get('partition_field')
-            if not partition_field:
+            if not spec.partition_field:
                 logger.warning(f"  - 🟡 Tabla '{table_name}' no está particionada. No se puede limpiar por mes.")
                 continue
+            partitioned_tables[table_name] = spec.partition_field
 
-            delete_query = f"DELETE FROM `{full_table_id}` WHERE DATE_TRUNC({partition_field}, MONTH) = DATE('{month_start_date}')"
-            try:
-                self.client.get_table(full_table_id)
-                self.client.query(delete_query).result()
+        if not partitioned_tables:
+            return
+
+        # Todos los DELETE en un único script multi-sentencia: un solo job para todas las tablas,
+        # sin consultar antes qué tablas existen. Un DELETE sobre una tabla inexistente se captura
+        # en el propio script y se devuelve su nombre; cualquier otro error se relanza.
+        # El mes llega como parámetro: el texto SQL es idéntico entre meses y ejecuciones.
+        delete_statements = "\n".join(
+            f"""
+            BEGIN
+                DELETE FROM `{self.dataset}.{table_name}`
+                WHERE {partition_field} BETWEEN month_start AND month_end;
+            EXCEPTION WHEN ERROR THEN
+                IF NOT STARTS_WITH(@@error.message, 'Not found') THEN RAISE; END IF;
+                SET missing_tables = ARRAY_CONCAT(missing_tables, ['{table_name}']);
+            END;"""
+            for table_name, partition_field in partitioned_tables.items()
+        )
+        delete_script = f"""
+            DECLARE month_start DATE DEFAULT @month_start;
+            -- Límite del mes calculado una sola vez para todos los DELETE
+            DECLARE month_end DATE DEFAULT LAST_DAY(month_start, MONTH);
+            DECLARE missing_tables ARRAY<STRING> DEFAULT [];
+            {delete_statements}
+            SELECT table_name FROM UNNEST(missing_tables) AS table_name;
+        """
+        delete_job_config = bigquery.QueryJobConfig(query_parameters=[
+            bigquery.ScalarQueryParameter("month_start", "DATE", month_start_date)
+        ])
+        try:
+            missing_tables = {row.table_name for row in self.client.query(delete_script, job_config=delete_job_config).result()}
+        except Exception as e:
+            logger.error(f"  - ❌ No se pudo limpiar las tablas {list(partitioned_tables)}: {e}")
+            raise
+        for table_name in partitioned_tables:
+            if table_name in missing_tables:
+                logger.info(f"  - 🔵 Tabla '{table_name}' no existe todavía, no se necesita limpieza.")
+            else:
                 logger.info(f"  - ✅ Datos de '{table_name}' para el mes {self.config.mes_vigencia} eliminados.")
-            except Exception as e:
-                if "Not found" in str(e):
-                    logger.info(f"  - 🔵 Tabla '{table_name}' no existe todavía, no se necesita limpieza.")
-                else:
-                    logger.error(f"  - ❌ No se pudo limpiar la tabla '{table_name}': {e}")
-                    raise
 
-    def load_dataframe_to_table(self, df: pd.DataFrame, table_name: str, write_disposition: str) -> Dict[str, Any]:
+    def _get_load_schema(self, table: pa.Table, table_name: str, partition_field: str) -> List[bigquery.SchemaField]:
         """
-        Loads a DataFrame to a BigQuery table, creating and configuring it on the fly.
-        This is the single point of contact for loading data.
+        Returns the explicit BigQuery schema for a table, derived from the Arrow
+        schema of the first shard and reused as long as later shards have the
+        same columns.
         """
-        if df.empty:
-            return {'status': 'SKIPPED', 'rows_written': 0}
+        schema = self._schema_cache.get(table_name)
+        if schema is None or [field.name for field in schema] != table.column_names:
+            schema = [
+                bigquery.SchemaField(
+                    arrow_field.name,
+                    "DATE" if arrow_field.name == partition_field else _bq_type_for(arrow_field.type)
+                )
+                for arrow_field in table.schema
+            ]
+            self._schema_cache[table_name] = schema
+        return schema
+
+    def _resolve_clustering(self, df: pd.DataFrame, table_name: str, table_id: str) -> None:
+        """
+        Fixes the clustering order of a table once per run. Existing tables keep
+        their current clustering spec (BigQuery rejects a different one on load);
+        new tables use the configured order if CLUSTERING_FIELDS sets one, or else
+        the available fields from low to high cardinality, measured on the first
+        shard. The result is stored on the TableSpec.
+        """
+        if table_name in self._clustering_resolved:
+            return
+        spec = self._table_specs[table_name]
+        try:
+            existing_fields = self.client.get_table(table_id).clustering_fields
+            clustering_fields = tuple(existing_fields) if existing_fields else spec.clustering_fields
+        except NotFound:
+            available = spec.clustering_index.intersection(df.columns, sort=False)
+            if table_name in self.config.clustering_fields:
+                clustering_fields = tuple(available)
+            else:
+                # Baja → alta cardinalidad: los filtros amplios (CARTERA, CANAL) podan primero
+                cardinality = {col: df[col].nunique() for col in available}
+                clustering_fields = tuple(sorted(available, key=cardinality.get))
+                logger.info(f"    🧩 Clustering para {table_id} por cardinalidad: {cardinality}")
+        clustering_fields = clustering_fields[:MAX_CLUSTERING_FIELDS]
 
-        full_table_name = self.config.output_tables[table_name]
-        table_id = f"{self.dataset}.{full_table_name}"
-        logger.info(f"  -> Cargando {len(df):,} registros a {table_id} (Modo: {write_disposition})")
+        if clustering_fields != spec.clustering_fields:
+            self._table_specs[table_name] = replace(spec, clustering_fields=clustering_fields)
+        self._clustering_resolved.add(table_name)
+
+    def _optimize_dtypes(self, df: pd.DataFrame, table_name: str) -> pd.DataFrame:
+        """
+        Prepares a shard for upload with Arrow-backed dtypes: integer columns other
+        than clustering and merge keys are downcast (floats are not), low-cardinality
+        string columns (clustering dimensions included) become Arrow dictionaries and
+        the rest is converted to the pyarrow backend, so the later Arrow conversion is
+        close to zero-copy. The partition column is left untouched.
+        """
+        spec = self._table_specs[table_name]
+        # Copia superficial: solo se reemplazan columnas, nunca se escribe en los buffers del llamador
+        prepared = df.copy(deep=False)
+        # Columnas agrupadas por dtype una sola vez, a partir de los metadatos
+        dtypes = prepared.dtypes.drop(spec.partition_field, errors='ignore')
+        # Dimensiones de clustering y claves de MERGE conservan su tipo exacto
+        key_cols = spec.clustering_index.union(pd.Index(spec.merge_keys), sort=False)
+        int_cols = dtypes.index[dtypes.map(pd.api.types.is_integer_dtype).astype(bool)].difference(key_cols, sort=False)
+        object_cols = dtypes.index[(dtypes == object).to_numpy()]
+
+        converted = {}
+        if len(int_cols):
+            # Sin 'unsigned': BigQuery no admite enteros sin signo de 64 bits en Parquet
+            converted.update(prepared[int_cols].apply(pd.to_numeric, downcast='integer').items())
+        # Los floats no se reducen a float32: 0.15 se escribiría como 0.15000000596 y dejaría de
+        # coincidir con OBJ_RECUPERO (dimensión y clave de MERGE) y con los filtros en Looker
+        dictionary_cols = pd.Index([])
+        if len(object_cols):
+            # max(..., 1): un shard sin filas no debe dividir por cero
+            unique_ratio = prepared[object_cols].nunique() / max(len(prepared.index), 1)
+            low_cardinality = unique_ratio.index[unique_ratio < 0.5].union(
+                spec.clustering_index.intersection(object_cols), sort=False
+            )
+            dictionary_cols = pd.Index([
+                col for col in low_cardinality
+                if pd.api.types.infer_dtype(prepared[col], skipna=True) == 'string'
+            ])
+        for col, values in converted.items():
+            prepared[col] = values
+
+        # Diccionarios aparte: convert_dtypes no debe reinterpretarlos
+        for col in dtypes.index:
+            if col in dictionary_cols:
+                prepared[col] = prepared[col].astype(_ARROW_DICTIONARY_STRING)
+            else:
+                # convert_integer=False: un float con valores enteros (p. ej. una tasa siempre 1.0)
+                # no debe pasar a int64, o el esquema de carga dependería de los datos del shard
+                prepared[col] = prepared[col].convert_dtypes(dtype_backend='pyarrow', convert_integer=False)
+        return prepared
+
+    def _to_parquet_buffer(self, table: pa.Table, schema: List[bigquery.SchemaField]) -> pa.Buffer:
+        """
+        Serializes an Arrow table to an in-memory Parquet buffer matching the
+        explicit load schema, so the upload needs no temporary file.
+        """
+        for i, schema_field in enumerate(schema):
+            column_type = table.schema.field(i).type
+            target_type = _BQ_TO_ARROW_TYPES.get(schema_field.field_type)
+            if target_type is None or column_type == target_type:
+                continue
+            # Solo se castea cuando BigQuery leería otro tipo (p. ej. columnas todo nulos
+            # o un shard que difiere del esquema en caché);
+            # los enteros/floats estrechos y los diccionarios se cargan tal cual.
+            if _bq_type_for(column_type) != schema_field.field_type or pa.types.is_decimal(column_type):
+                table = table.set_column(i, schema_field.name, table.column(i).cast(target_type))
+
+        sink = pa.BufferOutputStream()
+        pq.write_table(
+            table, sink, compression='SNAPPY', use_dictionary=True,
+            # Páginas de 1 MiB: menos cabeceras de página que el valor por defecto en tablas anchas
+            data_page_size=1 << 20,
+            # BigQuery no admite timestamps en nanosegundos dentro de Parquet
+            coerce_timestamps='us', allow_truncated_timestamps=True,
+        )
+        return sink.getvalue()
 
-        table_config_data = self.table_configs.get(table_name, {})
+    def _prepare_arrow_table(self, df: pd.DataFrame, table_name: str) -> Tuple[pa.Table, List[bigquery.SchemaField], Optional[str]]:
+        """
+        Converts a shard to Arrow once and returns it together with its explicit
+        BigQuery schema and the partition field present in the shard (if any).
+        """
+        spec = self._table_specs[table_name]
+        partition_field = spec.partition_field if spec.partition_field in df.columns else None
+        arrow_table = pa.Table.from_pandas(df, preserve_index=False)
+        # La partición y las columnas de fecha de día viajan como date32 (DATE lógico en Parquet,
+        # 4 bytes por fila): BigQuery no tiene que castear un TIMESTAMP al campo de partición y
+        # FECHA_SERVICIO se carga como DATE en todas las tablas, aunque el transformer la lleve
+        # como datetime64 normalizado. El cast sin 'safe' trunca la hora, igual que normalize().
+        for date_column in dict.fromkeys(filter(None, (partition_field, *_DATE_COLUMNS))):
+            index = arrow_table.schema.get_field_index(date_column)
+            if index < 0:
+                continue
+            column = arrow_table.column(index)
+            # Una fecha categórica llega como diccionario Arrow: se decodifica antes de castear
+            if pa.types.is_dictionary(column.type):
+                column = column.cast(column.type.value_type)
+            if not pa.types.is_date32(column.type):
+                arrow_table = arrow_table.set_column(index, date_column, column.cast(pa.date32(), safe=False))
+        return arrow_table, self._get_load_schema(arrow_table, table_name, partition_field), partition_field
+
+    def _submit_load(self, df: pd.DataFrame, table_name: str, table_id: str, write_disposition: str) -> bigquery.LoadJob:
+        """
+        Builds the load configuration for a table and starts the load job without waiting for it.
+        WRITE_TRUNCATE is only accepted on a ``$YYYYMMDD`` partition decorator: on a bare
+        table id it would replace the whole table, not just the days being loaded.
+        """
+        if write_disposition == bigquery.WriteDisposition.WRITE_TRUNCATE and '$' not in table_id:
+            raise ValueError(
+                f"WRITE_TRUNCATE sin decorador de partición reemplazaría toda la tabla {table_id}; "
+                f"el shard debe incluir su columna de partición"
+            )
+        spec = self._table_specs[table_name]
+
+        # Parquet + esquema explícito: sin inferencia de esquema por parte de BigQuery en cada carga
+        arrow_table, schema, partition_field = self._prepare_arrow_table(df, table_name)
         job_config = bigquery.LoadJobConfig(
-            autodetect=True,
+            source_format=bigquery.SourceFormat.PARQUET,
+            schema=schema,
             write_disposition=write_disposition,
             create_disposition="CREATE_IF_NEEDED",
         )
 
-        # Configure partitioning and clustering from central config
-        partition_field = table_config_data.get('partition_field')
-        if partition_field and partition_field in df.columns:
-            job_config.time_partitioning = TimePartitioning(type_=bigquery.TimePartitioningType.DAY, field=partition_field)
+        # Columnas nuevas en el shard se agregan a la tabla en lugar de fallar la carga
+        # (BigQuery solo lo admite en APPEND o en WRITE_TRUNCATE sobre un decorador $YYYYMMDD)
+        if write_disposition == bigquery.WriteDisposition.WRITE_APPEND or '$' in table_id:
+            job_config.schema_update_options = [bigquery.SchemaUpdateOption.ALLOW_FIELD_ADDITION]
+
+        # Configure partitioning and clustering from the prebuilt table spec
+        if partition_field:
+            job_config.time_partitioning = spec.time_partitioning
+
+        available_clustering_fields = spec.clustering_index.intersection(df.columns, sort=False)
+        if len(available_clustering_fields):
+            job_config.clustering_fields = available_clustering_fields.tolist()
+
+        # Parquet serializado una sola vez en memoria y subido directamente, sin archivo temporal
+        buffer = self._to_parquet_buffer(arrow_table, schema)
+        return self.client.load_table_from_file(
+            pa.BufferReader(buffer), table_id, job_config=job_config, size=buffer.size
+        )
+
+    def _await_load(self, job: bigquery.LoadJob, table_id: str) -> Dict[str, Any]:
+        """Waits for a submitted load job and summarizes its outcome."""
+        job.result()
+
+        # Las métricas de la carga vienen en el propio LoadJob: no hace falta un get_table extra
+        rows_written = job.output_rows or 0
+        table_size_mb = round((job.output_bytes or 0) / (1024 * 1024), 2)
+        load_seconds = round((job.ended - job.started).total_seconds(), 1) if job.started and job.ended else None
+        logger.info(
+            f"    ✅ {rows_written:,} filas, {len(job.schema or [])} columnas ({table_size_mb} MB) "
+            f"escritas en {table_id}, tiempo: {load_seconds}s"
+        )
+
+        return {
+            'status': 'SUCCESS', 'rows_written': rows_written,
+            'table_size_mb': table_size_mb, 'load_seconds': load_seconds,
+        }
+
+    def load_dataframe_to_table(self, df: pd.DataFrame, table_name: str, write_disposition: str) -> Dict[str, Any]:
+        """
+        Loads a DataFrame to a BigQuery table, creating and configuring it on the fly.
+        This is the single point of contact for loading data.
+        """
+        if len(df.index) == 0:
+            return {'status': 'SKIPPED', 'rows_written': 0}
 
-        clustering_fields = table_config_data.get('clustering_fields', [])
-        available_clustering_fields = [field for field in clustering_fields if field in df.columns]
-        if available_clustering_fields:
-            job_config.clustering_fields = available_clustering_fields
+        table_id = self._table_ids[table_name]
+        logger.info(f"  -> Cargando {len(df):,} registros a {table_id} (Modo: {write_disposition})")
 
         if self.config.dry_run:
             logger.info(f"    DRY-RUN: Simularía carga a {table_id}")
             return {'status': 'DRY_RUN', 'rows_written': len(df)}
 
+        df = self._optimize_dtypes(df, table_name)
+        spec = self._table_specs[table_name]
+        partition_field = spec.partition_field
         try:
-            job = self.client.load_table_from_dataframe(df, table_id, job_config=job_config)
-            job.result()
-
-            table = self.client.get_table(table_id)
-            if not table.description:
-                 table.description = table_config_data.get('description')
-                 self.client.update_table(table, ["description"])
-
-            return {'status': 'SUCCESS', 'rows_written': job.output_rows}
-
+            self._resolve_clustering(df, table_name, table_id)
+            if (self.config.overwrite_tables
+                    and self.config.write_strategy == 'merge'
+                    and spec.merge_keys
+                    and partition_field in df.columns):
+                return self._load_by_merge(df, table_name, table_id, partition_field)
+            if (write_disposition == bigquery.WriteDisposition.WRITE_TRUNCATE
+                    and self.config.write_strategy == 'partition_truncate'
+                    and partition_field in df.columns):
+                return self._load_by_partition(df, table_name, table_id, partition_field)
+            job = self._submit_load(df, table_name, table_id, write_disposition)
+            return self._await_load(job, table_id)
         except Exception as e:
             logger.error(f"    ❌ Error cargando datos a {table_id}: {e}")
             return {'status': 'ERROR', 'rows_written': 0, 'error': str(e)}
 
+    def _load_by_partition(self, df: pd.DataFrame, table_name: str, table_id: str, partition_field: str) -> Dict[str, Any]:
+        """
+        Replaces only the day partitions present in the DataFrame, loading each one
+        to ``table$YYYYMMDD`` with WRITE_TRUNCATE. This makes reruns idempotent per
+        day without DML DELETE statements. A partition already replaced by an earlier
+        flush of this run is appended to instead, so it keeps the previous files' rows.
+        Partition uploads run in parallel; shards spanning more than
+        MAX_PARTITION_LOAD_JOBS days fall back to a single DELETE of those days plus
+        one append job, to stay clear of load-job quotas.
+        """
+        partition_keys = pd.to_datetime(df[partition_field]).dt.strftime('%Y%m%d').fillna('__NULL__')
+        partitions = df.groupby(partition_keys, sort=False)
+        if partitions.ngroups > MAX_PARTITION_LOAD_JOBS:
+            return self._replace_days(df, table_name, table_id, partition_field)
+        replaced = self._replaced_partitions.setdefault(table_name, set())
+
+        def load_partition(partition: str, df_partition: pd.DataFrame) -> Dict[str, Any]:
+            partition_id = f"{table_id}${partition}"
+            write_disposition = (
+                bigquery.WriteDisposition.WRITE_APPEND if partition in replaced
+                else bigquery.WriteDisposition.WRITE_TRUNCATE
+            )
+            job = self._submit_load(df_partition, table_name, partition_id, write_disposition)
+            result = self._await_load(job, partition_id)
+            replaced.add(partition)
+            return result
+
+        # Cada partición es un upload + job independiente: se solapan en lugar de ir en serie
+        with ThreadPoolExecutor(max_workers=min(self.config.max_workers, partitions.ngroups)) as executor:
+            futures = [executor.submit(load_partition, partition, df_partition) for partition, df_partition in partitions]
+            results = [future.result() for future in futures]
+        logger.info(f"    🔁 {len(results)} partición(es) reemplazadas en {table_id}")
+
+        return {
+            'status': 'SUCCESS',
+            'rows_written': sum(result['rows_written'] for result in results),
+            'table_size_mb': round(sum(result['table_size_mb'] for result in results), 2),
+            'partitions_written': len(results),
+        }
+
+    def _replace_days(self, df: pd.DataFrame, table_name: str, table_id: str, partition_field: str) -> Dict[str, Any]:
+        """
+        Deletes the days present in the DataFrame with one DML statement and appends it in
+        one load job. Days already replaced by an earlier flush of this run are not deleted.
+        """
+        replaced = self._replaced_partitions.setdefault(table_name, set())
+        days = pd.to_datetime(df[partition_field]).dt.date.dropna().unique().tolist()
+        days_to_delete = [day for day in days if day.strftime('%Y%m%d') not in replaced]
+        logger.info(f"    🔁 {len(days_to_delete)} días en {table_id}: DELETE de esos días + un único APPEND")
+        if days_to_delete:
+            delete_job_config = bigquery.QueryJobConfig(query_parameters=[
+                bigquery.ArrayQueryParameter("days", "DATE", days_to_delete)
+            ])
+            try:
+                self.client.query(
+                    f"DELETE FROM `{table_id}` WHERE {partition_field} IN UNNEST(@days)", job_config=delete_job_config
+                ).result()
+            except NotFound:
+                logger.info(f"    🔵 Tabla {table_id} no existe todavía, se creará con la carga.")
+            # Ya vaciados: un fallo del APPEND no debe hacer que otro flush borre lo que sí se cargó
+            replaced.update(day.strftime('%Y%m%d') for day in days_to_delete)
+        job = self._submit_load(df, table_name, table_id, bigquery.WriteDisposition.WRITE_APPEND)
+        return self._await_load(job, table_id)
+
+    def _load_by_merge(self, df: pd.DataFrame, table_name: str, table_id: str, partition_field: str) -> Dict[str, Any]:
+        """
+        Loads the DataFrame into a temporary staging table and MERGEs it into the
+        target on the table's natural key. The partition range of the shard is part
+        of the join condition, so BigQuery only scans the affected partitions.
+        """
+        spec = self._table_specs[table_name]
+        staging_id = f"{table_id}_staging_{uuid.uuid4().hex[:8]}"
+
+        merge_keys = [col for col in spec.merge_keys if col in df.columns]
+        # Each file is aggregated on its own: a natural key repeated across files would make
+        # MERGE fail (several source rows) or silently overwrite the earlier file's measures
+        key_hashes = _natural_key_hashes(df, merge_keys)
+        seen = self._merged_keys.get(table_name, np.empty(0, dtype=key_hashes.dtype))
+        collisions = pd.Series(key_hashes).duplicated().to_numpy() | np.isin(key_hashes, seen)
+        if collisions.any():
+            sample = df.loc[collisions, merge_keys].iloc[0].to_dict()
+            raise ValueError(
+                f"{int(collisions.sum()):,} filas de {table_id} repiten una clave natural entre archivos "
+                f"(ej. {sample}); MERGE no puede combinarlas sin perder medidas. "
+                f"Use WRITE_STRATEGY=partition_truncate o delete_append"
+            )
+        partition_dates = pd.to_datetime(df[partition_field])
+        update_columns = [col for col in df.columns if col not in merge_keys]
+        insert_columns = ", ".join(f"`{col}`" for col in df.columns)
+        insert_values = ", ".join(f"S.`{col}`" for col in df.columns)
+        # Comparación null-safe: las dimensiones pueden venir vacías y NULL = NULL no coincide
+        key_condition = " AND ".join(
+            f"(T.`{col}` = S.`{col}` OR (T.`{col}` IS NULL AND S.`{col}` IS NULL))" for col in merge_keys
+        )
+        update_clause = (
+            "WHEN MATCHED THEN UPDATE SET " + ", ".join(f"`{col}` = S.`{col}`" for col in update_columns)
+            if update_columns else ""
+        )
+        merge_script = f"""
+            CREATE TABLE IF NOT EXISTS `{table_id}` LIKE `{staging_id}`;
+            MERGE `{table_id}` T
+            USING `{staging_id}` S
+            ON T.`{partition_field}` BETWEEN @partition_start AND @partition_end
+               AND {key_condition}
+            {update_clause}
+            WHEN NOT MATCHED THEN INSERT ({insert_columns}) VALUES ({insert_values});
+        """
+        merge_job_config = bigquery.QueryJobConfig(query_parameters=[
+            bigquery.ScalarQueryParameter("partition_start", "DATE", partition_dates.min().date()),
+            bigquery.ScalarQueryParameter("partition_end", "DATE", partition_dates.max().date()),
+        ])
+
+        try:
+            # Tabla de staging nueva por carga: WRITE_EMPTY, nunca un truncado sin decorador
+            job = self._submit_load(df, table_name, staging_id, bigquery.WriteDisposition.WRITE_EMPTY)
+            self._await_load(job, staging_id)
+            merge_job = self.client.query(merge_script, job_config=merge_job_config)
+            merge_job.result()
+        finally:
+            self.client.delete_table(staging_id, not_found_ok=True)
+        self._merged_keys[table_name] = np.concatenate([seen, key_hashes])
+
+        # En un script las estadísticas DML quedan en los jobs hijos
+        rows_written = sum(
+            child.num_dml_affected_rows or 0
+            for child in self.client.list_jobs(parent_job=merge_job.job_id)
+        )
+        logger.info(f"    🔀 MERGE en {table_id}: {rows_written:,} filas insertadas/actualizadas")
+        return {'status': 'SUCCESS', 'rows_written': rows_written}
+
     def load_all_tables(self, transformed_data: Dict[str, pd.DataFrame], write_disposition: str) -> Dict[str, Dict[str, Any]]:
         """
         Loads a dictionary of DataFrames to their respective BigQuery tables,
         passing the specified write_disposition to each load job.
+
+        The loads are independent and I/O-bound, so they run concurrently and the
+        total wall time is that of the slowest table.
         """
-        load_results = {}
-        for table_name, df in transformed_data.items():
-            if table_name in self.config.output_tables:
-                load_results[table_name] = self.load_dataframe_to_table(df, table_name, write_disposition)
-        return load_results
+        # Los shards vacíos se descartan aquí, sin despachar una carga por cada uno
+        tables_to_load = {
+            table_name: df for table_name, df in transformed_data.items()
+            if table_name in self.output_tables and len(df.index)
+        }
+        if not tables_to_load:
+            return {}
+
+        with ThreadPoolExecutor(max_workers=min(self.config.max_workers, len(tables_to_load))) as executor:
+            futures = {
+                table_name: executor.submit(self.load_dataframe_to_table, df, table_name, write_disposition)
+                for table_name, df in tables_to_load.items()
+            }
+            return {table_name: future.result() for table_name, future in futures.items()}
+
+    def stage_dataframe(self, df: pd.DataFrame, table_name: str) -> None:
+        """
+        Accumulates a per-file shard in memory so that flush() can load each
+        table with a single job instead of one job per (file, table) pair.
+        """
+        if table_name not in self.output_tables or len(df.index) == 0:
+            return
+        self._staging.setdefault(table_name, []).append(df)
+        self._staged_rows += len(df.index)
+
+    def staging_full(self) -> bool:
+        """Whether the staged rows reached STAGING_MAX_ROWS and should be flushed before staging more files."""
+        return self._staged_rows >= self.config.staging_max_rows
+
+    def flush(self, write_disposition: str) -> Dict[str, Dict[str, Any]]:
+        """Loads all staged shards, one load job per table, and empties the staging area."""
+        staged, self._staging = self._staging, {}
+        self._staged_rows = 0
+        if not staged:
+            logger.info("📭 No hay datos en staging para cargar.")
+            return {}
+
+        logger.info(f"📤 Cargando {len(staged)} tabla(s) desde staging ({sum(len(s) for s in staged.values())} shards)...")
+        combined = {table_name: pd.concat(shards, ignore_index=True) for table_name, shards in staged.items()}
+        del staged
+        return self.load_all_tables(combined, write_disposition)
 
     def validate_data_quality(self, data_dict: Dict[str, pd.DataFrame]) -> Dict[str, Dict]:
         """Validates data quality before loading to BigQuery."""
         logger.info("🔍 Validando calidad de datos...")
         quality_report = {}
         for table_name, df in data_dict.items():
+            # Las tablas que load_all_tables no va a cargar no necesitan validación
+            if table_name not in self.output_tables:
+                continue
             table_report = {
                 'table_name': table_name,
                 'row_count': len(df),
@@ -161,23 +668,47 @@ class BigQueryLoader:
             if df.empty:
                 table_report['status'] = 'EMPTY'
             else:
+                n_rows = len(df)
+                df_columns = set(df.columns)
                 required_columns = self._get_required_columns(table_name)
-                missing_columns = [col for col in required_columns if col not in df.columns]
+                missing_columns = [col for col in required_columns if col not in df_columns]
                 if missing_columns:
                     table_report['issues'].append(f"Columnas faltantes: {missing_columns}")
 
-                key_columns = self._get_key_columns(table_name)
-                for col in key_columns:
-                    if col in df.columns and df[col].isnull().sum() > 0:
-                        null_pct = (df[col].isnull().sum() / len(df)) * 100
-                        if null_pct > 50:
-                            table_report['issues'].append(f"Columna {col}: {null_pct:.1f}% valores nulos")
+                # Una sola reducción NumPy por chequeo, sobre todas las columnas a la vez
+                key_columns = [col for col in self._get_key_columns(table_name) if col in df_columns]
+                null_pcts = df[key_columns].isna().to_numpy().sum(axis=0) / n_rows * 100
+                for col, null_pct in zip(key_columns, null_pcts):
+                    if null_pct > 50:
+                        table_report['issues'].append(f"Columna {col}: {null_pct:.1f}% valores nulos")
+
+                count_columns = [col for col in df.columns if 'total_' in col or 'cantidad_' in col]
+                if count_columns:
+                    counts = df[count_columns].to_numpy(dtype='float64', na_value=np.nan)
+                    negative = np.any(counts < 0, axis=0)
+                    negative_columns = [col for col, is_negative in zip(count_columns, negative) if is_negative]
+                    if negative_columns:
+                        table_report['issues'].append(f"Conteos negativos en: {negative_columns}")
+
+                ratio_columns = [
+                    col for col in df.columns
+                    if col.startswith(('efectividad_', 'tasa_')) or col == 'ratio_primera_vez'
+                ]
+                if ratio_columns:
+                    ratios = df[ratio_columns].to_numpy(dtype='float64', na_value=np.nan)
+                    out_of_range = np.any((ratios < 0) | (ratios > 1), axis=0)
+                    invalid_ratios = [col for col, invalid in zip(ratio_columns, out_of_range) if invalid]
+                    if invalid_ratios:
+                        table_report['issues'].append(f"Ratios fuera de [0, 1] en: {invalid_ratios}")
 
                 if table_name == 'agregada':
                     key_dims = ['FECHA_SERVICIO', 'CARTERA', 'CANAL', 'OPERADOR', 'GRUPO_RESPUESTA']
-                    available_dims = [dim for dim in key_dims if dim in df.columns]
-                    if available_dims and df.duplicated(subset=available_dims).sum() > 0:
-                        table_report['issues'].append(f"{df.duplicated(subset=available_dims).sum()} filas duplicadas en dims clave")
+                    available_dims = [dim for dim in key_dims if dim in df_columns]
+                    if available_dims:
+                        duplicated = df.duplicated(subset=available_dims, keep='first')
+                        # Caso común: sin duplicados; solo se cuenta cuando hay que reportarlos
+                        if duplicated.any():
+                            table_report['issues'].append(f"{duplicated.sum()} filas duplicadas en dims clave")
 
                 if not table_report['issues']:
                     table_report['status'] = 'PASS'
@@ -206,64 +737,266 @@ class BigQueryLoader:
         }.get(table_name, [])
 
     def create_table_descriptions(self) -> None:
-        """Sets detailed, multi-line descriptions for all managed tables."""
+        """
+        Sets the descriptions of all managed tables. Runs once at the end of the
+        ETL, outside the load path, and only alters tables whose description
+        actually changed. Tables that do not exist yet are reported as missing.
+        """
         logger.info("📝 Actualizando descripciones de tablas para documentación...")
-        descriptions = {
-            'agregada': "Tabla principal agregada para dashboards de Looker Studio con métricas de gestión de cobranza.",
-            'comparativas': "Tabla de comparativas período-sobre-período usando lógica de mismo día hábil.",
-            'primera_vez': "Tabla de tracking de primera interacción por cliente y dimensión.",
-            'base_cartera': "Métricas base de cartera sin gestiones para análisis de cobertura."
-        }
-        for table_key, desc in descriptions.items():
-            table_name = self.config.output_tables.get(table_key)
+        statements = {}
+        for table_key, spec in self._table_specs.items():
+            desc = spec.description
+            table_name = self.output_tables.get(table_key)
             if not table_name: continue
-            table_id = f"{self.dataset}.{table_name}"
-            try:
-                table = self.client.get_table(table_id)
-                table.description = desc
-                self.client.update_table(table, ["description"])
-                logger.info(f"  - Descripción actualizada para: {table_name}")
-            except Exception as e:
-                logger.warning(f"  - ⚠️ No se pudo actualizar descripción de {table_name}: {e}")
+            escaped_desc = desc.replace('\\', '\\\\').replace('"', '\\"')
+            # INFORMATION_SCHEMA.TABLE_OPTIONS expone la descripción como literal entre comillas dobles
+            option_value = f'"{escaped_desc}"'.replace('\\', '\\\\').replace("'", "\\'")
+            # Cada tabla en su propio bloque: un error se registra sin abortar las demás
+            statements[table_name] = f"""
+                BEGIN
+                    -- Sin la tabla, TABLE_OPTIONS devuelve NULL, que también es DISTINCT FROM la descripción
+                    IF NOT EXISTS (
+                        SELECT 1 FROM `{self.dataset}.INFORMATION_SCHEMA.TABLES` WHERE table_name = '{table_name}'
+                    ) THEN
+                        SET results = ARRAY_CONCAT(results, [STRUCT('{table_name}' AS table_name, 'MISSING' AS status)]);
+                    ELSEIF (
+                        SELECT option_value FROM `{self.dataset}.INFORMATION_SCHEMA.TABLE_OPTIONS`
+                        WHERE table_name = '{table_name}' AND option_name = 'description'
+                    ) IS DISTINCT FROM '{option_value}' THEN
+                        ALTER TABLE IF EXISTS `{self.dataset}.{table_name}` SET OPTIONS (description="{escaped_desc}");
+                        SET results = ARRAY_CONCAT(results, [STRUCT('{table_name}' AS table_name, 'UPDATED' AS status)]);
+                    END IF;
+                EXCEPTION WHEN ERROR THEN
+                    SET results = ARRAY_CONCAT(results, [STRUCT('{table_name}' AS table_name, @@error.message AS status)]);
+                END;"""
+        if not statements:
+            return
+
+        # Un único script DDL; en re-ejecuciones sin cambios no se modifica ningún metadato
+        script = f"""
+            DECLARE results ARRAY<STRUCT<table_name STRING, status STRING>> DEFAULT [];
+            {"".join(statements.values())}
+            SELECT table_name, status FROM UNNEST(results);
+        """
+        job_config = bigquery.QueryJobConfig(labels={"etl": "table_options"})
+        try:
+            results = {row.table_name: row.status for row in self.client.query(script, job_config=job_config).result()}
+            for table_name, status in results.items():
+                if status == 'UPDATED':
+                    logger.info(f"  - Descripción actualizada para: {table_name}")
+                elif status == 'MISSING':
+                    logger.info(f"  - 🔵 Tabla '{table_name}' no existe todavía, sin descripción que actualizar.")
+                else:
+                    logger.warning(f"  - ⚠️ No se pudo actualizar la descripción de {table_name}: {status}")
+            if len(results) < len(statements):
+                logger.info(f"  - {len(statements) - len(results)} descripción(es) sin cambios")
+        except Exception as e:
+            logger.warning(f"  - ⚠️ No se pudieron actualizar las descripciones de {list(statements)}: {e}")
 
     def optimize_for_looker_studio(self) -> None:
         """Applies labels to tables for better organization and tracking."""
         logger.info("⚡ Aplicando optimizaciones (etiquetas) para Looker Studio...")
-        for table_key in self.config.output_tables:
-            table_name = self.config.output_tables[table_key]
-            table_id = f"{self.dataset}.{table_name}"
-            try:
-                query = f"""
-                ALTER TABLE `{table_id}` 
+        last_updated = datetime.now().strftime("%Y%m%d")
+        statements = {
+            table_name: f"""
+                ALTER TABLE IF EXISTS `{self.dataset}.{table_name}`
                 SET OPTIONS (labels=[
-                    ('source', 'faco_etl'), 
+                    ('source', 'faco_etl'),
                     ('optimized_for', 'looker_studio'),
                     ('table_type', '{table_key}'),
-                    ('last_updated', '{datetime.now().strftime("%Y%m%d")}')
-                ])
+                    ('last_updated', '{last_updated}')
+                ]);
                 """
-                if not self.config.dry_run:
-                    self.client.query(query).result()
-                    logger.info(f"  - ✅ Etiquetas aplicadas a: {table_name}")
-            except Exception as e:
-                logger.warning(f"  - ⚠️ Error aplicando optimización a {table_name}: {e}")
+            for table_key, table_name in self.output_tables.items()
+        }
+        if self.config.dry_run or not statements:
+            return
+
+        # Todas las etiquetas en un solo script: un job en vez de uno por tabla
+        job_config = bigquery.QueryJobConfig(labels={"etl": "table_options"})
+        try:
+            self.client.query("\n".join(statements.values()), job_config=job_config).result()
+            for table_name in statements:
+                logger.info(f"  - ✅ Etiquetas aplicadas a: {table_name}")
+        except Exception as e:
+            logger.warning(f"  - ⚠️ Error aplicando optimización a {list(statements)}: {e}")
+
+    def create_materialized_views(self) -> None:
+        """
+        Creates a daily materialized view over the agregada table so that Looker
+        Studio reads precomputed sums instead of re-aggregating on every refresh.
+        It shares the base table's partitioning and clustering, and BigQuery
+        refreshes it incrementally after each load.
+        """
+        table_name = self.output_tables.get('agregada')
+        if not table_name or self.config.dry_run:
+            return
+        spec = self._table_specs['agregada']
+        view_id = f"{self._table_ids['agregada']}_diaria_mv"
+        logger.info(f"🧮 Creando vista materializada diaria: {view_id}")
+        # Solo agregaciones incrementales (SUM/COUNT): los ratios y LAG se calculan en Looker
+        ddl = f"""
+            CREATE MATERIALIZED VIEW IF NOT EXISTS `{view_id}`
+            PARTITION BY {spec.partition_field}
+            CLUSTER BY CARTERA, CANAL
+            OPTIONS (enable_refresh = true, refresh_interval_minutes = 60)
+            AS
+            SELECT
+                {spec.partition_field}, CARTERA, CANAL,
+                SUM(total_interacciones) AS total_interacciones,
+                SUM(contactos_efectivos) AS contactos_efectivos,
+                SUM(clientes_unicos_contactados) AS clientes_unicos_contactados,
+                SUM(cantidad_compromisos) AS cantidad_compromisos,
+                SUM(monto_total_comprometido) AS monto_total_comprometido,
+                COUNT(*) AS combinaciones
+            FROM `{self._table_ids['agregada']}`
+            GROUP BY {spec.partition_field}, CARTERA, CANAL
+        """
+        job_config = bigquery.QueryJobConfig(labels={"etl": "materialized_view"})
+        try:
+            self.client.query(ddl, job_config=job_config).result()
+            logger.info(f"  - ✅ Vista materializada lista: {view_id}")
+        except Exception as e:
+            logger.warning(f"  - ⚠️ No se pudo crear la vista materializada {view_id}: {e}")
 
     def get_table_statistics(self) -> Dict[str, Dict]:
         """Retrieves and logs statistics for all managed tables."""
         logger.info("📊 Obteniendo estadísticas de tablas de destino...")
+        if not self.output_tables:
+            return {}
+
+        # Un get_table por tabla, en paralelo: el tiempo total es el de la llamada más lenta
         statistics = {}
-        for table_key in self.config.output_tables:
-            table_name = self.config.output_tables[table_key]
-            table_id = f"{self.dataset}.{table_name}"
+        with ThreadPoolExecutor(max_workers=len(self.output_tables)) as executor:
+            futures = {
+                executor.submit(self.client.get_table, self._table_ids[table_key]): table_name
+                for table_key, table_name in self.output_tables.items()
+            }
+            for future in as_completed(futures):
+                table_name = futures[future]
+                try:
+                    table = future.result()
+                    stats = {
+                        'num_rows': table.num_rows,
+                        'size_mb': round(table.num_bytes / (1024 * 1024), 2) if table.num_bytes else 0,
+                        'last_modified': table.modified.isoformat() if table.modified else None
+                    }
+                    statistics[table_name] = stats
+                    logger.info(f"  - 📋 {table_name}: {stats['num_rows']:,} filas, {stats['size_mb']} MB")
+                except Exception as e:
+                    statistics[table_name] = {'error': str(e)}
+        return {name: statistics[name] for name in self.output_tables.values()}
+
+
+class StorageWriteLoader(BigQueryLoader):
+    """
+    BigQueryLoader variant that appends through the BigQuery Storage Write API.
+
+    Each appended table gets a PENDING write stream fed with Arrow record batches;
+    all streams are committed together by flush(), so the rows of a run become
+    visible atomically per table. Truncate and MERGE loads still use load jobs.
+    Requires the optional ``google-cloud-bigquery-storage`` package.
+    """
+
+    def __init__(self, config: ETLConfig):
+        super().__init__(config)
+        try:
+            from google.cloud import bigquery_storage_v1
+        except ImportError as e:
+            raise ImportError(
+                "USE_STORAGE_WRITE_API=true requiere 'google-cloud-bigquery-storage' (pip install faco-etl[storage])"
+            ) from e
+        self._storage = bigquery_storage_v1
+        self._write_client = bigquery_storage_v1.BigQueryWriteClient(credentials=config.credentials_object)
+        # Finalized PENDING streams per table, committed together in flush()
+        self._pending_streams: Dict[str, List[str]] = {}
+        logger.info("💾 Storage Write API habilitada para cargas en modo APPEND")
+
+    def load_dataframe_to_table(self, df: pd.DataFrame, table_name: str, write_disposition: str) -> Dict[str, Any]:
+        """Appends through a pending write stream; other write modes fall back to load jobs."""
+        uses_merge = self.config.overwrite_tables and self.config.write_strategy == 'merge'
+        if (len(df.index) == 0 or self.config.dry_run or uses_merge
+                or write_disposition != bigquery.WriteDisposition.WRITE_APPEND):
+            return super().load_dataframe_to_table(df, table_name, write_disposition)
+
+        table_id = self._table_ids[table_name]
+        logger.info(f"  -> Agregando {len(df):,} registros a {table_id} vía Storage Write API")
+        try:
+            self._resolve_clustering(df, table_name, table_id)
+            arrow_table, schema, partition_field = self._prepare_arrow_table(self._optimize_dtypes(df, table_name), table_name)
+            self._ensure_table(table_name, table_id, schema, partition_field)
+            # La Storage Write API exige los tipos Arrow exactos de la tabla (sin diccionarios ni nanosegundos)
+            arrow_table = arrow_table.cast(
+                pa.schema([pa.field(f.name, _BQ_TO_ARROW_TYPES[f.field_type]) for f in schema]), safe=False
+            )
+            stream_name = self._append_arrow(table_id, arrow_table)
+            self._pending_streams.setdefault(table_id, []).append(stream_name)
+            return {'status': 'SUCCESS', 'rows_written': arrow_table.num_rows}
+        except Exception as e:
+            logger.error(f"    ❌ Error agregando datos a {table_id}: {e}")
+            return {'status': 'ERROR', 'rows_written': 0, 'error': str(e)}
+
+    def _ensure_table(self, table_name: str, table_id: str, schema: List[bigquery.SchemaField], partition_field: Optional[str]) -> None:
+        """Creates the target table if needed: write streams, unlike load jobs, never create tables."""
+        spec = self._table_specs[table_name]
+        table = bigquery.Table(table_id, schema=schema)
+        if partition_field:
+            table.time_partitioning = spec.time_partitioning
+        clustering_fields = spec.clustering_index.intersection(table.schema_names, sort=False)
+        if len(clustering_fields):
+            table.clustering_fields = clustering_fields.tolist()
+        self.client.create_table(table, exists_ok=True)
+
+    def _append_arrow(self, table_id: str, arrow_table: pa.Table) -> str:
+        """Writes an Arrow table to a new PENDING stream, finalizes it and returns its name."""
+        types, writer = self._storage.types, self._storage.writer
+        project, dataset, table = table_id.split('.')
+        parent = self._write_client.table_path(project, dataset, table)
+        write_stream = self._write_client.create_write_stream(
+            parent=parent, write_stream=types.WriteStream(type_=types.WriteStream.Type.PENDING)
+        )
+
+        request_template = types.AppendRowsRequest(write_stream=write_stream.name)
+        request_template.arrow_rows.writer_schema.serialized_schema = arrow_table.schema.serialize().to_pybytes()
+        append_rows_stream = writer.AppendRowsStream(self._write_client, request_template)
+        try:
+            futures = []
+            for record_batch in arrow_table.to_batches(max_chunksize=STORAGE_WRITE_BATCH_ROWS):
+                request = types.AppendRowsRequest()
+                request.arrow_rows.rows.serialized_record_batch = record_batch.serialize().to_pybytes()
+                futures.append(append_rows_stream.send(request))
+            for future in futures:
+                future.result()
+        finally:
+            append_rows_stream.close()
+
+        self._write_client.finalize_write_stream(name=write_stream.name)
+        return write_stream.name
+
+    def flush(self, write_disposition: str) -> Dict[str, Dict[str, Any]]:
+        """Loads all staged shards and then commits every pending write stream."""
+        results = super().flush(write_disposition)
+        pending, self._pending_streams = self._pending_streams, {}
+        committed_tables = {}
+        for table_id, stream_names in pending.items():
+            project, dataset, table = table_id.split('.')
             try:
-                table = self.client.get_table(table_id)
-                stats = {
-                    'num_rows': table.num_rows,
-                    'size_mb': round(table.num_bytes / (1024 * 1024), 2) if table.num_bytes else 0,
-                    'last_modified': table.modified.isoformat() if table.modified else None
-                }
-                statistics[table_name] = stats
-                logger.info(f"  - 📋 {table_name}: {stats['num_rows']:,} filas, {stats['size_mb']} MB")
+                response = self._write_client.batch_commit_write_streams(
+                    self._storage.types.BatchCommitWriteStreamsRequest(
+                        parent=self._write_client.table_path(project, dataset, table),
+                        write_streams=stream_names,
+                    )
+                )
+                if response.stream_errors:
+                    raise RuntimeError("; ".join(error.error_message for error in response.stream_errors))
+                committed_tables[table] = None
+                logger.info(f"    ✅ {len(stream_names)} stream(s) confirmados en {table_id}")
             except Exception as e:
-                statistics[table_name] = {'error': str(e)}
-        return statistics
\ No newline at end of file
+                logger.error(f"    ❌ Error confirmando streams en {table_id}: {e}")
+                committed_tables[table] = str(e)
+
+        for table_name, result in results.items():
+            error = committed_tables.get(self.output_tables.get(table_name))
+            if error:
+                results[table_name] = {'status': 'ERROR', 'rows_written': 0, 'error': error}
+        return results
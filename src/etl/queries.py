@@ -1,6 +1,7 @@
 """
 Central repository for BigQuery SQL queries used in the FACO ETL.
-Usa parámetros de consulta (@param) para seguridad y rendimiento.
+Usa parámetros de consulta (@param) tipados para seguridad y rendimiento: las fechas
+llegan como DATE y las listas de IDs como ARRAY, sin interpolar valores en el SQL.
 """
 
 QUERIES = {
@@ -10,41 +11,65 @@ QUERIES = {
             FECHA_ASIGNACION, FECHA_TRANDEUDA, FECHA_CIERRE, VENCIMIENTO,
             DIAS_GESTION, DIAS_PARA_CIERRE, ESTADO
         FROM `{dataset}.dash_P3fV4dWNeMkN5RJMhV8e_calendario_v4`
-        WHERE DATE_TRUNC(FECHA_ASIGNACION, MONTH) = DATE(@mes_vigencia)
+        -- Rango sobre la columna (sin funciones) para que BigQuery pueda podar particiones
+        WHERE FECHA_ASIGNACION >= @mes_vigencia
+        AND FECHA_ASIGNACION < DATE_ADD(@mes_vigencia, INTERVAL 1 MONTH)
         AND UPPER(ESTADO) = UPPER(@estado_vigencia)
         ORDER BY FECHA_ASIGNACION DESC
     """,
     'get_asignacion': """
-        SELECT
-            t1.cod_luna, t1.cuenta, t1.cliente, t1.telefono, t1.dni, t1.tramo_gestion,
-            t1.negocio, t1.zona, t1.archivo, t1.min_vto, t1.fraccionamiento,
-            t1.cuota_fracc_act, t1.rango_renta, t1.decil_contacto, t1.decil_pago,
-            t1.tipo_linea, DATE(t1.creado_el) as fecha_carga
-        FROM `{dataset}.batch_P3fV4dWNeMkN5RJMhV8e_asignacion` AS t1
-        JOIN UNNEST(@archivos) AS archivo_param ON t1.archivo = archivo_param
+        WITH asignacion AS (
+            SELECT
+                t1.cod_luna, t1.cuenta, t1.cliente, t1.telefono, t1.dni, t1.tramo_gestion,
+                t1.negocio, t1.zona, t1.archivo, t1.min_vto, t1.fraccionamiento,
+                t1.cuota_fracc_act, t1.rango_renta, t1.decil_contacto, t1.decil_pago,
+                t1.tipo_linea, DATE(t1.creado_el) as fecha_carga
+            FROM `{dataset}.batch_P3fV4dWNeMkN5RJMhV8e_asignacion` AS t1
+            JOIN UNNEST(@archivos) AS archivo_param ON t1.archivo = archivo_param
+        )
+        -- Conteos aproximados (HyperLogLog) solo para diagnóstico en logs
+        SELECT a.*, stats._n_cuenta, stats._n_cod_luna
+        FROM asignacion AS a
+        CROSS JOIN (
+            SELECT
+                APPROX_COUNT_DISTINCT(cuenta) AS _n_cuenta,
+                APPROX_COUNT_DISTINCT(cod_luna) AS _n_cod_luna
+            FROM asignacion
+        ) AS stats
     """,
     'get_gestiones_bot': """
-        SELECT
-            SAFE_CAST(t1.document AS INT64) as cod_luna, t1.date, t1.management,
-            t1.sub_management, t1.compromiso, t1.fecha_compromiso, t1.duracion,
-            t1.phone, t1.campaign_name, t1.origin, t1.weight
-        FROM `{dataset}.voicebot_P3fV4dWNeMkN5RJMhV8e` AS t1
-        JOIN UNNEST(@cod_lunas) AS cod_luna_param ON SAFE_CAST(t1.document AS INT64) = cod_luna_param
-        WHERE DATE(t1.date) BETWEEN DATE(@fecha_inicio) AND DATE(@fecha_fin)
-        AND SAFE_CAST(t1.document AS INT64) IS NOT NULL
-        ORDER BY t1.date DESC
+        -- document se castea una sola vez; el JOIN y la proyección reutilizan el alias
+        WITH gestiones AS (
+            SELECT
+                SAFE_CAST(t1.document AS INT64) AS cod_luna, t1.date, t1.management,
+                t1.sub_management, t1.compromiso, t1.fecha_compromiso, t1.duracion,
+                t1.phone, t1.campaign_name, t1.origin, t1.weight
+            FROM `{dataset}.voicebot_P3fV4dWNeMkN5RJMhV8e` AS t1
+            WHERE DATE(t1.date) BETWEEN @fecha_inicio AND @fecha_fin
+        )
+        SELECT g.*
+        FROM gestiones AS g
+        JOIN UNNEST(@cod_lunas) AS cod_luna_param ON g.cod_luna = cod_luna_param
+        -- Shard de la consulta (GESTIONES_SHARDS); ABS: en BigQuery MOD(-7, 4) = -3, que ningún shard pediría
+        WHERE MOD(ABS(g.cod_luna), @n_shards) = @shard
+        ORDER BY g.date DESC
     """,
     'get_gestiones_humano': """
-        SELECT
-            SAFE_CAST(t1.document AS INT64) as cod_luna, t1.date, t1.management,
-            t1.sub_management, t1.n1, t1.n2, t1.n3, t1.monto_compromiso, t1.fecha_compromiso,
-            t1.nombre_agente, t1.correo_agente, t1.phone, t1.duracion, t1.campaign_name,
-            t1.origin, t1.weight
-        FROM `{dataset}.mibotair_P3fV4dWNeMkN5RJMhV8e` AS t1
-        JOIN UNNEST(@cod_lunas) AS cod_luna_param ON SAFE_CAST(t1.document AS INT64) = cod_luna_param
-        WHERE DATE(t1.date) BETWEEN DATE(@fecha_inicio) AND DATE(@fecha_fin)
-        AND SAFE_CAST(t1.document AS INT64) IS NOT NULL
-        ORDER BY t1.date DESC
+        WITH gestiones AS (
+            SELECT
+                SAFE_CAST(t1.document AS INT64) AS cod_luna, t1.date, t1.management,
+                t1.sub_management, t1.n1, t1.n2, t1.n3, t1.monto_compromiso, t1.fecha_compromiso,
+                t1.nombre_agente, t1.correo_agente, t1.phone, t1.duracion, t1.campaign_name,
+                t1.origin, t1.weight
+            FROM `{dataset}.mibotair_P3fV4dWNeMkN5RJMhV8e` AS t1
+            WHERE DATE(t1.date) BETWEEN @fecha_inicio AND @fecha_fin
+        )
+        SELECT g.*
+        FROM gestiones AS g
+        JOIN UNNEST(@cod_lunas) AS cod_luna_param ON g.cod_luna = cod_luna_param
+        -- Shard de la consulta (GESTIONES_SHARDS); ABS: en BigQuery MOD(-7, 4) = -3, que ningún shard pediría
+        WHERE MOD(ABS(g.cod_luna), @n_shards) = @shard
+        ORDER BY g.date DESC
     """,
     'get_all_trandeuda_files': """
         SELECT DISTINCT archivo
@@ -5,8 +5,10 @@ Implements business logic for aggregating cobranza data by specified dimensions
 with differentiation between total actions vs unique clients metrics.
 """
 
+import re
 import pandas as pd
 import numpy as np
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, date, timedelta
 from typing import Dict, List, Optional, Tuple, Any
 from loguru import logger
@@ -14,10 +16,58 @@ from loguru import logger
 from core.config import ETLConfig
 from etl.business_days import BusinessDaysProcessor
 
+# Arrow-backed strings for dimension columns: one offsets+bytes buffer instead of a Python object per row
+_ARROW_STRING = pd.StringDtype('pyarrow')
+
+# Portfolio type rules in priority order; each alternative is a lookahead anchored at the
+# start, so the first rule that matches anywhere in the filename wins (lastgroup = its name)
+_CARTERA_RE = re.compile(
+    r'^(?:(?=.*?(?P<TEMPRANA>TEMPRANA))'
+    r'|(?=.*?(?P<CUOTA_FIJA_ANUAL>CF_ANN|CUOTA_FIJA))'
+    r'|(?=.*?(?P<ALTAS_NUEVAS>_AN_|ALTAS_NUEVAS))'
+    r'|(?=.*?(?P<COBRANDING>COBRANDING)))',
+    re.IGNORECASE | re.DOTALL,
+)
+_CARTERA_TYPES = list(_CARTERA_RE.groupindex) + ['OTRAS']
+
 
 class CobranzaTransformer:
     """Transform raw data into aggregated business dimensions"""
     
+    # Recovery objective per management segment (first matching pattern wins); anything else gets the default
+    RECOVERY_OBJECTIVES = [
+        ('AL VCTO|VENCIMIENTO', 0.15),  # 15% for at maturity
+        ('TEMPRANA|4 Y 15', 0.25),      # 25% for early collection
+        ('TARDIA', 0.30),               # 30% for late
+    ]
+    DEFAULT_RECOVERY_OBJECTIVE = 0.20
+    _RECOVERY_OBJECTIVE_RES = [(re.compile(pattern), objective) for pattern, objective in RECOVERY_OBJECTIVES]
+    
+    # String dimensions unified as categoricals across channels before concatenation
+    CATEGORICAL_DIMENSIONS = [
+        'CARTERA', 'CANAL', 'OPERADOR', 'GRUPO_RESPUESTA', 'GLOSA_RESPUESTA',
+        'NIVEL_1', 'NIVEL_2', 'NIVEL_3', 'SERVICIO'
+    ]
+    
+    # Columns the gestiones pipeline reads from the raw channel frames and from the base dimensions
+    GESTION_COLUMNS = [
+        'cod_luna', 'date', 'management', 'duracion',
+        'n1', 'n2', 'n3', 'monto_compromiso', 'nombre_agente'  # HUMANO only
+    ]
+    BASE_COLUMNS_FOR_GESTIONES = [
+        'cod_luna', 'cliente', 'CARTERA', 'SERVICIO', 'VENCIMIENTO', 'FECHA_ASIGNACION',
+        'FECHA_INICIO_GESTION', 'FECHA_CIERRE', 'OBJ_RECUPERO'
+    ]
+    
+    # First-time tracking keys; flag i is bit i of the packed uint8 column '_primera_vez_bits'
+    FIRST_TIME_DIMENSIONS = [
+        ['cliente', 'CARTERA', 'CANAL'],
+        ['cliente', 'CARTERA', 'CANAL', 'OPERADOR'],
+        ['cliente', 'CANAL'],
+        ['cliente', 'GRUPO_RESPUESTA'],
+        ['cliente'],  # General first-time flag (first interaction ever for this client)
+    ]
+    
     def __init__(self, config: ETLConfig, business_days: BusinessDaysProcessor):
         self.config = config
         self.business_days = business_days
@@ -41,84 +91,97 @@ class CobranzaTransformer:
             'SERVICIO'
         ]
         
+        # Single load timestamp for the whole run, stored as datetime64 (not per-row objects)
+        self.load_timestamp = np.datetime64(pd.Timestamp.now().floor('us'), 'us')
+        
         logger.info(f"🔄 Transformer inicializado con {len(self.aggregation_dimensions)} dimensiones de agregación")
     
     def create_base_dimensions(self, df_asignacion: pd.DataFrame, df_calendario: pd.DataFrame) -> pd.DataFrame:
         """Create base dimensions from assignment and calendar data"""
         logger.info("📋 Creando dimensiones base")
         
-        # Merge assignment with calendar data
-        df_base = df_asignacion.merge(
-            df_calendario[['ARCHIVO', 'FECHA_ASIGNACION', 'FECHA_CIERRE', 'FECHA_TRANDEUDA']],
-            left_on='archivo',
-            right_on=df_calendario['ARCHIVO'] + '.txt',
-            how='left'
+        # Merge assignment with calendar data. The '.txt' suffix is added on the small calendar
+        # side and both keys share one categorical dtype, so the join matches integer codes
+        df_calendario_keys = df_calendario[['ARCHIVO', 'FECHA_ASIGNACION', 'FECHA_CIERRE', 'FECHA_TRANDEUDA']].copy()
+        calendario_archivos = df_calendario_keys['ARCHIVO'] + '.txt'
+        key_dtype = pd.CategoricalDtype(
+            pd.Index(df_asignacion['archivo'].dropna().unique(), dtype=object).union(
+                pd.Index(calendario_archivos.dropna().unique(), dtype=object)
+            )
         )
+        df_calendario_keys['_archivo_key'] = calendario_archivos.astype(key_dtype)
+        df_asignacion_keys = df_asignacion.copy(deep=False)
+        df_asignacion_keys['_archivo_key'] = df_asignacion['archivo'].astype(key_dtype)
+        df_base = df_asignacion_keys.merge(
+            df_calendario_keys,
+            on='_archivo_key',
+            how='left',
+            validate='many_to_one'
+        ).drop(columns='_archivo_key')
         
         # Create derived dimensions
-        df_base['CARTERA'] = df_base['archivo'].apply(self._extract_cartera_type)
-        df_base['SERVICIO'] = df_base['negocio']
+        df_base['CARTERA'] = self._extract_cartera_types(df_base['archivo'])
+        df_base['SERVICIO'] = df_base['negocio'].astype(_ARROW_STRING)
         
         # FIXED: Replace problematic management segment creation
-        df_base['CARTERA'] = self._create_management_segment_safe(df_base)
+        # Few distinct segments repeated on every row: keep them as categorical codes
+        df_base['CARTERA'] = self._create_management_segment_safe(df_base).astype('category')
         
         # Set management period dates
         df_base['FECHA_INICIO_GESTION'] = df_base['FECHA_ASIGNACION']
         df_base['VENCIMIENTO'] = df_base['min_vto']
         
         # Calculate recovery objective based on business rules
-        df_base['OBJ_RECUPERO'] = df_base['tramo_gestion'].apply(self._calculate_recovery_objective)
+        df_base['OBJ_RECUPERO'] = self._calculate_recovery_objectives(df_base['tramo_gestion'])
         
         logger.info(f"✅ Dimensiones base creadas: {len(df_base)} registros")
         return df_base
     
-    def _extract_cartera_type(self, filename: str) -> str:
-        """Extract portfolio type from filename"""
-        if pd.isna(filename):
-            return 'OTRAS'
-            
-        filename_upper = str(filename).upper()
-        
-        if 'TEMPRANA' in filename_upper:
-            return 'TEMPRANA'
-        elif 'CF_ANN' in filename_upper or 'CUOTA_FIJA' in filename_upper:
-            return 'CUOTA_FIJA_ANUAL'
-        elif '_AN_' in filename_upper or 'ALTAS_NUEVAS' in filename_upper:
-            return 'ALTAS_NUEVAS'
-        elif 'COBRANDING' in filename_upper:
-            return 'COBRANDING'
-        else:
-            return 'OTRAS'
+    def _extract_cartera_types(self, filenames: pd.Series) -> pd.Series:
+        """Extract portfolio type from filenames: one regex scan per distinct filename"""
+        codes, uniques = pd.factorize(filenames)
+        type_codes = np.array(
+            [_CARTERA_TYPES.index(m.lastgroup) if (m := _CARTERA_RE.match(str(name))) else len(_CARTERA_TYPES) - 1
+             for name in uniques] + [len(_CARTERA_TYPES) - 1],
+            dtype=np.int8,
+        )
+        # codes == -1 (missing filename) picks the trailing 'OTRAS' entry
+        carteras = pd.Categorical.from_codes(type_codes[codes], categories=_CARTERA_TYPES)
+        return pd.Series(carteras, index=filenames.index)
     
     def _create_management_segment_safe(self, df: pd.DataFrame) -> pd.Series:
         """Create management segment combining tramo_gestion and fraccionamiento - SAFE VERSION"""
-        segments = []
-        for _, row in df.iterrows():
-            # FIXED: Safe string concatenation with None checks
-            segment = str(row.get('tramo_gestion', '')) if pd.notna(row.get('tramo_gestion')) else ''
-            
-            if row.get('fraccionamiento') == 'SI':
-                segment += ' - FRACCIONADO'
-            
-            cuota_fracc = row.get('cuota_fracc_act')
-            if cuota_fracc and pd.notna(cuota_fracc) and str(cuota_fracc).strip():
-                segment += f" - CUOTA_{cuota_fracc}"
-                
-            segments.append(segment if segment else 'NO_ESPECIFICADO')
-        return pd.Series(segments, index=df.index)
+        empty = pd.Series(pd.NA, index=df.index, dtype=_ARROW_STRING)
+        # Vectorized: whole-column string ops instead of a Python loop over iterrows()
+        segment = df.get('tramo_gestion', empty).astype(_ARROW_STRING).fillna('')
+        
+        frac_mask = df.get('fraccionamiento', empty).eq('SI').fillna(False).to_numpy(dtype=bool)
+        segment = segment.where(~frac_mask, segment + ' - FRACCIONADO')
+        
+        cuota = df.get('cuota_fracc_act', empty).astype(_ARROW_STRING)
+        cuota_mask = (cuota.str.strip().fillna('') != '').to_numpy(dtype=bool)
+        segment = segment.where(~cuota_mask, segment + ' - CUOTA_' + cuota.fillna(''))
+        
+        return segment.mask(segment.eq(''), 'NO_ESPECIFICADO')
+    
+    def _calculate_recovery_objectives(self, tramo_gestion: pd.Series) -> np.ndarray:
+        """Calculate recovery objective based on management segment: rules run once per distinct tramo"""
+        codes, uniques = pd.factorize(tramo_gestion)
+        # Lookup table indexed by factorize code; the trailing entry serves codes == -1 (missing tramo)
+        objectives = np.array(
+            [self._calculate_recovery_objective(tramo) for tramo in uniques] + [self.DEFAULT_RECOVERY_OBJECTIVE]
+        )
+        return objectives[codes]
     
     def _calculate_recovery_objective(self, tramo_gestion: str) -> float:
-        """Calculate recovery objective based on management segment"""
-        if pd.isna(tramo_gestion):
-            return 0.20
-            
-        objectives = {
-            'AL VCTO': 0.15,        # 15% for at maturity
-            'ENTRE 4 Y 15D': 0.25,  # 25% for early collection
-            'TEMPRANA': 0.20,       # 20% for early
-            'TARDIA': 0.30          # 30% for late
-        }
-        return objectives.get(str(tramo_gestion), 0.20)  # Default 20%
+        """Calculate recovery objective for a single management segment (first matching pattern wins)"""
+        if not isinstance(tramo_gestion, str):
+            return self.DEFAULT_RECOVERY_OBJECTIVE
+        tramo_upper = tramo_gestion.upper()
+        for pattern, objective in self._RECOVERY_OBJECTIVE_RES:
+            if pattern.search(tramo_upper):
+                return objective
+        return self.DEFAULT_RECOVERY_OBJECTIVE
     
     def process_gestiones_with_first_time_tracking(self, df_gestiones: pd.DataFrame, 
                                                   df_base: pd.DataFrame,
@@ -134,35 +197,62 @@ class CobranzaTransformer:
         
         logger.info(f"🔄 Procesando gestiones {canal} con tracking de primera vez")
         
-        # Merge with base dimensions
-        df_enriched = df_gestiones.merge(df_base, on='cod_luna', how='inner')
+        # Merge with base dimensions, carrying only the columns used downstream on either side
+        df_enriched = df_gestiones[df_gestiones.columns.intersection(self.GESTION_COLUMNS, sort=False)].merge(
+            df_base[df_base.columns.intersection(self.BASE_COLUMNS_FOR_GESTIONES, sort=False)],
+            on='cod_luna',
+            how='inner'
+        )
         
         if df_enriched.empty:
             logger.warning(f"⚠️  No hay coincidencias entre gestiones {canal} y asignaciones")
             return pd.DataFrame()
         
         # Add channel-specific columns
-        df_enriched['CANAL'] = canal
+        n_rows = len(df_enriched.index)
+        df_enriched['CANAL'] = self._constant_categorical(canal, n_rows)
         
         if canal == 'BOT':
-            df_enriched['OPERADOR'] = 'SISTEMA_BOT'
-            df_enriched['GRUPO_RESPUESTA'] = df_enriched['management'].fillna('NO_DISPONIBLE')
-            df_enriched['GLOSA_RESPUESTA'] = df_enriched['management'].fillna('NO_DISPONIBLE')
-            df_enriched['NIVEL_1'] = df_enriched['management'].fillna('NO_DISPONIBLE')
-            df_enriched['NIVEL_2'] = ''
-            df_enriched['NIVEL_3'] = ''
+            # Constant and management-derived dimensions as categoricals: one int8 code per row
+            # instead of an object pointer per row, and management is cleaned only once
+            df_enriched['OPERADOR'] = self._constant_categorical('SISTEMA_BOT', n_rows)
+            respuesta = df_enriched['management'].fillna('NO_DISPONIBLE').astype('category')
+            df_enriched['GRUPO_RESPUESTA'] = respuesta
+            df_enriched['GLOSA_RESPUESTA'] = respuesta
+            df_enriched['NIVEL_1'] = respuesta
+            df_enriched['NIVEL_2'] = self._constant_categorical('', n_rows)
+            df_enriched['NIVEL_3'] = self._constant_categorical('', n_rows)
             df_enriched['monto_compromiso'] = 0  # Bots don't handle money commitments
         else:  # HUMANO
-            df_enriched['OPERADOR'] = df_enriched['nombre_agente'].fillna('SIN_AGENTE')
+            # Raw HUMANO-only columns are popped once consumed, so both channels end with the same
+            # columns and the later concat does not pad the BOT rows with all-null n1/n2/n3/agent
+            df_enriched['OPERADOR'] = df_enriched.pop('nombre_agente').fillna('SIN_AGENTE')
             df_enriched['GRUPO_RESPUESTA'] = df_enriched['management'].fillna('NO_DISPONIBLE')
             df_enriched['GLOSA_RESPUESTA'] = self._create_detailed_response_safe(df_enriched)
-            df_enriched['NIVEL_1'] = df_enriched['n1'].fillna('')
-            df_enriched['NIVEL_2'] = df_enriched['n2'].fillna('')
-            df_enriched['NIVEL_3'] = df_enriched['n3'].fillna('')
+            df_enriched['NIVEL_1'] = df_enriched.pop('n1').fillna('')
+            df_enriched['NIVEL_2'] = df_enriched.pop('n2').fillna('')
+            df_enriched['NIVEL_3'] = df_enriched.pop('n3').fillna('')
             df_enriched['monto_compromiso'] = df_enriched['monto_compromiso'].fillna(0)
         
+        # Management outcome flags, computed once here and reused by the first-time marks and the
+        # aggregation. management has few distinct values: evaluate them per unique value, then
+        # broadcast to the rows by factorized code (nulls get code -1 and are never a match)
+        management_codes, management_values = pd.factorize(df_enriched['management'])
+        management_upper = pd.Index(management_values).astype('string').str.upper()
+        is_efectivo = np.append(np.asarray(management_upper == 'CONTACTO_EFECTIVO', dtype=bool), False)
+        is_compromiso = np.append(management_upper.str.contains('COMPROMISO', regex=False).to_numpy(dtype=bool, na_value=False), False)
+        df_enriched['es_contacto_efectivo'] = is_efectivo[management_codes]
+        df_enriched['es_compromiso'] = is_compromiso[management_codes]
+        
         # Add service date and business day information
-        df_enriched['FECHA_SERVICIO'] = df_enriched['date'].dt.date
+        # Day-truncated datetime64 (not Python date objects): sorts, groupbys and merges stay in C
+        fecha_servicio = df_enriched['date'].dt.normalize()
+        if fecha_servicio.dt.tz is not None:
+            fecha_servicio = fecha_servicio.dt.tz_localize(None)
+        df_enriched['FECHA_SERVICIO'] = fecha_servicio
+        if 'duracion' in df_enriched.columns:
+            # Call length in minutes never needs more than float32 precision
+            df_enriched['duracion'] = df_enriched['duracion'].astype('float32')
         df_enriched = self.business_days.add_business_day_columns(df_enriched, 'date')
         
         # Mark first-time interactions per client and dimension combination
@@ -174,66 +264,56 @@ class CobranzaTransformer:
         logger.info(f"✅ Gestiones {canal} procesadas: {len(df_enriched)} interacciones")
         return df_enriched
     
+    @staticmethod
+    def _constant_categorical(value: str, n_rows: int) -> pd.Categorical:
+        """Column of a single repeated value backed by int8 codes"""
+        return pd.Categorical.from_codes(np.zeros(n_rows, dtype=np.int8), categories=[value])
+    
     def _create_detailed_response_safe(self, df: pd.DataFrame) -> pd.Series:
         """Create detailed response combining n1, n2, n3 levels - SAFE VERSION"""
-        responses = []
-        for _, row in df.iterrows():
-            parts = []
-            for level in ['n1', 'n2', 'n3']:
-                value = row.get(level)
-                if pd.notna(value) and str(value).strip():
-                    parts.append(str(value).strip())
-            
-            if parts:
-                response = ' - '.join(parts)
-            else:
-                # Fallback to management field
-                management = row.get('management')
-                response = str(management) if pd.notna(management) else 'NO_DISPONIBLE'
-            
-            responses.append(response)
-        return pd.Series(responses, index=df.index)
+        empty = pd.Series(pd.NA, index=df.index, dtype=_ARROW_STRING)
+        response = empty
+        # Fold the three levels column by column: blanks count as missing, no per-row loop
+        for level in ['n1', 'n2', 'n3']:
+            part = df.get(level, empty).astype(_ARROW_STRING).str.strip()
+            part = part.mask(part.eq(''))
+            both = response.notna() & part.notna()
+            response = response.fillna(part).mask(both, response + ' - ' + part)
+        
+        # Fallback to management field
+        return response.fillna(df.get('management', empty).astype(_ARROW_STRING)).fillna('NO_DISPONIBLE')
     
     def _mark_first_time_interactions(self, df: pd.DataFrame) -> pd.DataFrame:
         """Mark first-time interactions per client and key dimension combinations"""
-        df = df.sort_values('date').copy()
-        
-        # Key dimension combinations for first-time tracking
-        dimension_combinations = [
-            ['cliente', 'CARTERA', 'CANAL'],
-            ['cliente', 'CARTERA', 'CANAL', 'OPERADOR'],
-            ['cliente', 'CANAL'],
-            ['cliente', 'GRUPO_RESPUESTA'],
-        ]
+        # Stable sort once: the first row of each key is then its first-time interaction
+        df = df.sort_values('date', kind='mergesort')
         
-        for dims in dimension_combinations:
-            column_name = f"es_primera_vez_{'_'.join(dims).lower()}"
-            df[column_name] = (
-                df.groupby(dims)['date'].transform('min') == df['date']
-            )
+        # Each key column is factorized once and its integer codes are shared by all the
+        # combinations, so duplicated() hashes ints instead of re-hashing strings per combination
+        key_columns = list(dict.fromkeys(col for dims in self.FIRST_TIME_DIMENSIONS for col in dims))
+        key_codes = pd.DataFrame({col: pd.factorize(df[col])[0] for col in key_columns})
         
-        # General first-time flag (first interaction ever for this client)
-        df['es_primera_vez_cliente'] = (
-            df.groupby('cliente')['date'].transform('min') == df['date']
-        )
+        # One byte per row for all first-time flags instead of one bool column per combination
+        bits = np.zeros(len(df.index), dtype=np.uint8)
+        for bit, dims in enumerate(self.FIRST_TIME_DIMENSIONS):
+            is_first = ~key_codes.duplicated(subset=dims, keep='first').to_numpy()
+            bits |= is_first.astype(np.uint8) << bit
+        df['_primera_vez_bits'] = bits
         
         logger.debug("✅ Flags de primera vez marcados")
         return df
     
+    def _first_time_flag(self, df: pd.DataFrame, dims: List[str]) -> np.ndarray:
+        """Unpack one first-time flag from '_primera_vez_bits' as a boolean array"""
+        bit = self.FIRST_TIME_DIMENSIONS.index(dims)
+        return ((df['_primera_vez_bits'].to_numpy() >> bit) & 1).astype(bool)
+    
     def _mark_first_effective_contact(self, df: pd.DataFrame) -> pd.DataFrame:
         """Mark first effective contact per client"""
-        effective_contacts = df[
-            df['management'].isin(['CONTACTO_EFECTIVO', 'Contacto_Efectivo'])
-        ].copy()
-        
-        if not effective_contacts.empty:
-            df['es_primer_contacto_efectivo'] = (
-                df.groupby('cliente')['date'].transform(
-                    lambda x: x == x.min() if df.loc[x.index, 'management'].isin(['CONTACTO_EFECTIVO', 'Contacto_Efectivo']).any() else False
-                )
-            )
-        else:
-            df['es_primer_contacto_efectivo'] = False
+        is_effective = df['es_contacto_efectivo']
+        # Earliest effective date per client in one Cython transform; non-effective rows are NaT
+        first_effective_date = df['date'].where(is_effective).groupby(df['cliente'], sort=False).transform('min')
+        df['es_primer_contacto_efectivo'] = is_effective & (df['date'] == first_effective_date)
         
         return df
     
@@ -256,113 +336,111 @@ class CobranzaTransformer:
                 logger.warning(f"⚠️  Dimensión faltante: {dim}, agregando valor por defecto")
                 df_gestiones_enriched[dim] = 'NO_DISPONIBLE'
         
-        # Group by all specified dimensions
-        grouped = df_gestiones_enriched.groupby(self.aggregation_dimensions)
+        # Category dimensions: groupby hashes small integer codes instead of every string per row
+        for dim in self.aggregation_dimensions:
+            df_gestiones_enriched[dim] = df_gestiones_enriched[dim].astype('category')
+        
+        # Unpack only the first-time flags that are summed below
+        df_gestiones_enriched['es_primera_vez_cliente'] = self._first_time_flag(df_gestiones_enriched, ['cliente'])
+        df_gestiones_enriched['es_primera_vez_cliente_cartera_canal'] = self._first_time_flag(
+            df_gestiones_enriched, ['cliente', 'CARTERA', 'CANAL']
+        )
         
-        # Aggregate metrics
-        aggregated = grouped.agg({
+        # Group by all specified dimensions (observed=True skips the cartesian product of categories)
+        grouped = df_gestiones_enriched.groupby(self.aggregation_dimensions, observed=True, sort=False)
+        
+        # Named aggregation: flat output columns with their final names, no rename pass
+        aggregated = grouped.agg(
             # ACTIONS METRICS (each interaction counts)
-            'cod_luna': 'count',  # total_interacciones
-            'duracion': ['sum', 'mean'],  # duracion_total, duracion_promedio
-            
-            # CLIENT METRICS (unique clients)
-            'cliente': 'nunique',  # clientes_unicos_contactados
+            total_interacciones=('cod_luna', 'count'),
+            duracion_total_minutos=('duracion', 'sum'),
+            duracion_promedio_minutos=('duracion', 'mean'),
             
             # EFFECTIVENESS METRICS
-            'management': [
-                lambda x: (x.isin(['CONTACTO_EFECTIVO', 'Contacto_Efectivo'])).sum(),  # contactos_efectivos
-                lambda x: (x.str.contains('COMPROMISO|Compromiso', na=False)).sum()  # compromisos_declarados
-            ],
+            contactos_efectivos=('es_contacto_efectivo', 'sum'),
+            compromisos_declarados=('es_compromiso', 'sum'),
             
             # FIRST-TIME METRICS
-            'es_primera_vez_cliente': 'sum',  # primera_vez_contactados
-            'es_primer_contacto_efectivo': 'sum',  # primera_vez_efectivos
-            'es_primera_vez_cliente_cartera_canal': 'sum',  # primera_vez_por_cartera_canal
+            primera_vez_contactados=('es_primera_vez_cliente', 'sum'),
+            primera_vez_efectivos=('es_primer_contacto_efectivo', 'sum'),
+            primera_vez_cartera_canal=('es_primera_vez_cliente_cartera_canal', 'sum'),
             
             # FINANCIAL METRICS (only for human channel)
-            'monto_compromiso': ['sum', 'count'],  # monto_total, cantidad_compromisos
+            monto_total_comprometido=('monto_compromiso', 'sum'),
+            cantidad_compromisos=('monto_compromiso', 'count'),
             
             # BUSINESS DAY METRICS
-            'dia_habil_del_mes': 'first',  # business day of month
-            'es_dia_habil': 'first',  # is business day
-            
-        }).reset_index()
-        
-        # Flatten column names
-        aggregated.columns = [
-            '_'.join(col).strip('_') if isinstance(col, tuple) else col 
-            for col in aggregated.columns
-        ]
-        
-        # Rename columns for clarity
-        column_mapping = {
-            'cod_luna_count': 'total_interacciones',
-            'duracion_sum': 'duracion_total_minutos',
-            'duracion_mean': 'duracion_promedio_minutos',
-            'cliente_nunique': 'clientes_unicos_contactados',
-            'management_<lambda_0>': 'contactos_efectivos',
-            'management_<lambda_1>': 'compromisos_declarados',
-            'es_primera_vez_cliente_sum': 'primera_vez_contactados',
-            'es_primer_contacto_efectivo_sum': 'primera_vez_efectivos',
-            'es_primera_vez_cliente_cartera_canal_sum': 'primera_vez_cartera_canal',
-            'monto_compromiso_sum': 'monto_total_comprometido',
-            'monto_compromiso_count': 'cantidad_compromisos',
-            'dia_habil_del_mes_first': 'dia_habil_del_mes',
-            'es_dia_habil_first': 'es_dia_habil'
-        }
+            dia_habil_del_mes=('dia_habil_del_mes', 'first'),
+            es_dia_habil=('es_dia_habil', 'first'),
+        ).reset_index()
+        
+        # CLIENT METRICS (unique clients)
+        aggregated.insert(
+            aggregated.columns.get_loc('duracion_promedio_minutos') + 1,
+            'clientes_unicos_contactados',
+            self._grouped_nunique(grouped, df_gestiones_enriched['cliente'])
+        )
         
-        # Apply column mapping (only for existing columns)
-        for old_name, new_name in column_mapping.items():
-            if old_name in aggregated.columns:
-                aggregated = aggregated.rename(columns={old_name: new_name})
+        # Date and numeric dimensions go back to their plain dtype; string ones stay categorical
+        for dim in self.aggregation_dimensions:
+            categories = aggregated[dim].cat.categories
+            if pd.api.types.infer_dtype(categories, skipna=True) != 'string':
+                aggregated[dim] = aggregated[dim].astype(categories.dtype)
         
         # Calculate KPIs
         aggregated = self._calculate_aggregated_kpis(aggregated)
         
         # Add DD/MM/YYYY format
-        aggregated['FECHA_FORMATO'] = pd.to_datetime(aggregated['FECHA_SERVICIO']).dt.strftime('%d/%m/%Y')
+        # Few distinct dates: strftime once per unique date, then gather by factorized code
+        date_codes, unique_dates = pd.factorize(aggregated['FECHA_SERVICIO'])
+        formatted_dates = pd.to_datetime(unique_dates).strftime('%d/%m/%Y')
+        aggregated['FECHA_FORMATO'] = pd.Categorical.from_codes(date_codes, categories=formatted_dates)
         
         logger.info(f"✅ Agregación completada: {len(aggregated)} combinaciones de dimensiones")
         return aggregated
     
+    @staticmethod
+    def _grouped_nunique(grouped, values: pd.Series) -> np.ndarray:
+        """
+        Distinct non-null values per group, in the grouper's result order.
+        
+        Factorizes the values to int codes and hashes (group, code) pairs as one int64
+        key, then counts pairs per group with bincount - no per-group hash sets.
+        """
+        group_ids = grouped.ngroup()
+        codes, uniques = pd.factorize(values)
+        valid = group_ids.notna().to_numpy() & (codes >= 0)
+        n_codes = max(len(uniques), 1)
+        pairs = group_ids.to_numpy()[valid].astype(np.int64) * n_codes + codes[valid]
+        distinct_pairs = pd.unique(pairs)
+        return np.bincount(distinct_pairs // n_codes, minlength=grouped.ngroups)
+    
     def _calculate_aggregated_kpis(self, df: pd.DataFrame) -> pd.DataFrame:
         """Calculate KPIs for aggregated data"""
         # Effectiveness ratios
-        df['efectividad_canal'] = np.where(
-            df['total_interacciones'] > 0,
-            df['contactos_efectivos'] / df['total_interacciones'],
-            0
-        )
-        
-        df['tasa_compromiso'] = np.where(
-            df['total_interacciones'] > 0,
-            df['cantidad_compromisos'] / df['total_interacciones'],
-            0
-        )
+        df['efectividad_canal'] = self._safe_ratio(df['contactos_efectivos'], df['total_interacciones'])
+        df['tasa_compromiso'] = self._safe_ratio(df['cantidad_compromisos'], df['total_interacciones'])
         
         # First-time ratios
-        df['ratio_primera_vez'] = np.where(
-            df['clientes_unicos_contactados'] > 0,
-            df['primera_vez_contactados'] / df['clientes_unicos_contactados'],
-            0
-        )
+        df['ratio_primera_vez'] = self._safe_ratio(df['primera_vez_contactados'], df['clientes_unicos_contactados'])
         
         # Productivity metrics
-        df['interacciones_por_cliente'] = np.where(
-            df['clientes_unicos_contactados'] > 0,
-            df['total_interacciones'] / df['clientes_unicos_contactados'],
-            0
-        )
+        df['interacciones_por_cliente'] = self._safe_ratio(df['total_interacciones'], df['clientes_unicos_contactados'])
         
         # Financial ratios (for human channel)
-        df['monto_promedio_compromiso'] = np.where(
-            df['cantidad_compromisos'] > 0,
-            df['monto_total_comprometido'] / df['cantidad_compromisos'],
-            0
-        )
+        df['monto_promedio_compromiso'] = self._safe_ratio(df['monto_total_comprometido'], df['cantidad_compromisos'])
         
         return df
     
+    @staticmethod
+    def _safe_ratio(numerator: pd.Series, denominator: pd.Series) -> np.ndarray:
+        """numerator / denominator in float32 (reporting precision), 0 where the denominator is not positive"""
+        num = numerator.to_numpy(dtype=np.float32, na_value=np.nan)
+        den = denominator.to_numpy(dtype=np.float32, na_value=np.nan)
+        result = np.zeros(len(num), dtype=np.float32)
+        np.divide(num, den, out=result, where=den > 0)
+        return result
+    
     def create_period_comparisons(self, df_current: pd.DataFrame) -> pd.DataFrame:
         """
         Create period-over-period comparisons using same business day logic.
@@ -374,22 +452,22 @@ class CobranzaTransformer:
         
         logger.info("🔄 Creando comparativas de período usando mismo día hábil")
         
+        # Business-day helpers run once per distinct service date, not once per aggregated row
         comparisons = []
-        
-        for _, row in df_current.iterrows():
-            current_date = pd.to_datetime(row['FECHA_SERVICIO']).date()
+        for fecha_servicio in df_current['FECHA_SERVICIO'].dropna().unique():
+            current_date = pd.to_datetime(fecha_servicio).date()
             
             # Get same business day from previous month
             prev_month_date = self.business_days.get_same_business_day_previous_month(current_date)
             
             if prev_month_date:
-                comparison_data = row.to_dict()
-                comparison_data.update({
+                comparison_data = {
+                    'FECHA_SERVICIO': fecha_servicio,
                     'fecha_actual': current_date,
                     'fecha_comparacion': prev_month_date,
                     'puede_comparar': True,
                     'dia_habil_numero': self.business_days.calculate_business_day_of_month(current_date),
-                })
+                }
                 
                 # Get comparison info
                 comparison_info = self.business_days.get_comparison_periods_info(current_date)
@@ -398,7 +476,12 @@ class CobranzaTransformer:
                 comparisons.append(comparison_data)
         
         if comparisons:
-            df_comparisons = pd.DataFrame(comparisons)
+            df_lookup = pd.DataFrame(comparisons)
+            # Lookup columns replace same-named row columns; the inner join drops non-comparable dates
+            overlapping = df_lookup.columns.drop('FECHA_SERVICIO')
+            df_comparisons = df_current.drop(columns=overlapping, errors='ignore').merge(
+                df_lookup, on='FECHA_SERVICIO', how='inner'
+            )
             logger.info(f"✅ Comparativas creadas: {len(df_comparisons)} registros")
             return df_comparisons
         else:
@@ -424,19 +507,20 @@ class CobranzaTransformer:
         # Step 1: Create base dimensions
         df_base = self.create_base_dimensions(df_asignacion, df_calendario)
         
-        # Step 2: Process bot gestiones
-        df_bot_enriched = pd.DataFrame()
-        if not df_voicebot.empty:
-            df_bot_enriched = self.process_gestiones_with_first_time_tracking(
-                df_voicebot, df_base, 'BOT'
-            )
-        
-        # Step 3: Process human gestiones
-        df_humano_enriched = pd.DataFrame()
-        if not df_mibotair.empty:
-            df_humano_enriched = self.process_gestiones_with_first_time_tracking(
-                df_mibotair, df_base, 'HUMANO'
-            )
+        # Steps 2-3: Process bot and human gestiones. The channels are independent and
+        # df_base is only read, so both run concurrently (pandas releases the GIL in C code)
+        channels = {'BOT': df_voicebot, 'HUMANO': df_mibotair}
+        channels = {canal: df for canal, df in channels.items() if not df.empty}
+        enriched = {}
+        if channels:
+            with ThreadPoolExecutor(max_workers=min(self.config.max_workers, len(channels))) as executor:
+                futures = {
+                    canal: executor.submit(self.process_gestiones_with_first_time_tracking, df, df_base, canal)
+                    for canal, df in channels.items()
+                }
+                enriched = {canal: future.result() for canal, future in futures.items()}
+        df_bot_enriched = enriched.pop('BOT', pd.DataFrame())
+        df_humano_enriched = enriched.pop('HUMANO', pd.DataFrame())
         
         # Step 4: Combine all gestiones
         gestiones_combined = []
@@ -445,8 +529,14 @@ class CobranzaTransformer:
         if not df_humano_enriched.empty:
             gestiones_combined.append(df_humano_enriched)
         
+        # Shared category sets per string dimension: concat keeps the int codes, no object fallback
+        self._align_categoricals(gestiones_combined, self.CATEGORICAL_DIMENSIONS)
+        
+        # Only the list keeps the per-channel frames alive: they are freed right after the concat
+        del df_bot_enriched, df_humano_enriched
         if gestiones_combined:
-            df_all_gestiones = pd.concat(gestiones_combined, ignore_index=True)
+            df_all_gestiones = pd.concat(gestiones_combined, ignore_index=True, sort=False)
+            gestiones_combined.clear()
             logger.info(f"📊 Total gestiones combinadas: {len(df_all_gestiones)}")
         else:
             logger.warning("⚠️  No hay gestiones para procesar")
@@ -455,11 +545,12 @@ class CobranzaTransformer:
         # Step 5: Aggregate by dimensions
         df_agregada = self.aggregate_by_dimensions(df_all_gestiones)
         
-        # Step 6: Create comparisons
-        df_comparativas = self.create_period_comparisons(df_agregada)
-        
-        # Step 7: Create first-time tracking table
+        # Step 6: Create first-time tracking table (last consumer of the interaction-level frame)
         df_primera_vez = self._create_first_time_tracking_table(df_all_gestiones)
+        del df_all_gestiones
+        
+        # Step 7: Create comparisons
+        df_comparativas = self.create_period_comparisons(df_agregada)
         
         # Step 8: Create base portfolio metrics
         df_base_cartera = self._create_base_portfolio_metrics(df_base, df_trandeuda, df_pagos)
@@ -482,13 +573,30 @@ class CobranzaTransformer:
         
         return result
     
+    @staticmethod
+    def _align_categoricals(frames: List[pd.DataFrame], columns: List[str]) -> None:
+        """Cast each column to one categorical dtype shared by all frames (in place)"""
+        if not frames:
+            return
+        for col in columns:
+            if not all(col in df.columns for df in frames):
+                continue
+            # Union of the (few) category values as plain objects, so frames whose strings are
+            # Arrow-backed and frames that are already object categoricals share one dtype
+            categories = pd.Index([], dtype=object)
+            for df in frames:
+                categories = categories.union(pd.Categorical(df[col]).categories.astype(object), sort=False)
+            dtype = pd.CategoricalDtype(categories)
+            for df in frames:
+                df[col] = df[col].astype(dtype)
+    
     def _create_first_time_tracking_table(self, df_gestiones: pd.DataFrame) -> pd.DataFrame:
         """Create dedicated table for first-time interaction tracking"""
         if df_gestiones.empty:
             return pd.DataFrame()
         
         # Filter only first-time interactions
-        first_time_df = df_gestiones[df_gestiones['es_primera_vez_cliente'] == True].copy()
+        first_time_df = df_gestiones[self._first_time_flag(df_gestiones, ['cliente'])]
         
         if first_time_df.empty:
             return pd.DataFrame()
@@ -500,7 +608,7 @@ class CobranzaTransformer:
         ]
         
         df_tracking = first_time_df[tracking_columns].copy()
-        df_tracking['timestamp_primera_interaccion'] = pd.Timestamp.now()
+        df_tracking['timestamp_primera_interaccion'] = np.full(len(df_tracking), self.load_timestamp)
         
         logger.info(f"📝 Tabla de primera vez creada: {len(df_tracking)} clientes únicos")
         return df_tracking
@@ -514,44 +622,47 @@ class CobranzaTransformer:
         # Aggregate by portfolio dimensions
         portfolio_dims = ['CARTERA', 'FECHA_ASIGNACION', 'SERVICIO']
         
-        df_portfolio = df_base.groupby(portfolio_dims).agg({
-            'cod_luna': 'count',
-            'cuenta': 'nunique',
-            'cliente': 'nunique'
-        }).reset_index()
+        # String dims as categoricals; observed=True keeps only the combinations actually present
+        df_dims = df_base[portfolio_dims].astype({'CARTERA': 'category', 'SERVICIO': 'category'})
+        grouped = df_base.groupby([df_dims[dim] for dim in portfolio_dims], observed=True, sort=False)
+        df_portfolio = grouped['cod_luna'].count().rename('total_cod_lunas').reset_index()
+        df_portfolio['cuentas_unicas'] = self._grouped_nunique(grouped, df_base['cuenta'])
+        df_portfolio['clientes_unicos'] = self._grouped_nunique(grouped, df_base['cliente'])
         
-        df_portfolio.columns = portfolio_dims + ['total_cod_lunas', 'cuentas_unicas', 'clientes_unicos']
+        # Only the grouping dims and the account key are needed for the financial merges:
+        # build that narrow frame once instead of copying all of df_base per source
+        if not df_trandeuda.empty or not df_pagos.empty:
+            df_keys = df_dims
+            df_keys['cuenta_str'] = df_base['cuenta'].astype(str)
         
         # Add financial metrics if available
         if not df_trandeuda.empty:
             # Aggregate debt by account
-            debt_summary = df_trandeuda.groupby('cod_cuenta').agg({
+            debt_summary = df_trandeuda.groupby('cod_cuenta', sort=False).agg({
                 'monto_exigible': 'sum'
             }).reset_index()
             debt_summary['cod_cuenta'] = debt_summary['cod_cuenta'].astype(str)
             
             # Merge with base (need to match account format)
-            df_base_str = df_base.copy()
-            df_base_str['cuenta_str'] = df_base_str['cuenta'].astype(str)
-            
-            debt_by_portfolio = df_base_str.merge(debt_summary, left_on='cuenta_str', right_on='cod_cuenta', how='left')
-            debt_aggregated = debt_by_portfolio.groupby(portfolio_dims)['monto_exigible'].sum().reset_index()
+            debt_by_portfolio = df_keys.merge(
+                debt_summary, left_on='cuenta_str', right_on='cod_cuenta', how='left', validate='many_to_one'
+            )
+            debt_aggregated = debt_by_portfolio.groupby(portfolio_dims, observed=True, sort=False)['monto_exigible'].sum().reset_index()
             
             df_portfolio = df_portfolio.merge(debt_aggregated, on=portfolio_dims, how='left')
             df_portfolio['monto_exigible'] = df_portfolio['monto_exigible'].fillna(0)
         
         if not df_pagos.empty:
             # Similar process for payments
-            payment_summary = df_pagos.groupby('cod_sistema').agg({
+            payment_summary = df_pagos.groupby('cod_sistema', sort=False).agg({
                 'monto_cancelado': 'sum'
             }).reset_index()
             payment_summary['cod_sistema'] = payment_summary['cod_sistema'].astype(str)
             
-            df_base_str = df_base.copy()
-            df_base_str['cuenta_str'] = df_base_str['cuenta'].astype(str)
-            
-            payment_by_portfolio = df_base_str.merge(payment_summary, left_on='cuenta_str', right_on='cod_sistema', how='left')
-            payment_aggregated = payment_by_portfolio.groupby(portfolio_dims)['monto_cancelado'].sum().reset_index()
+            payment_by_portfolio = df_keys.merge(
+                payment_summary, left_on='cuenta_str', right_on='cod_sistema', how='left', validate='many_to_one'
+            )
+            payment_aggregated = payment_by_portfolio.groupby(portfolio_dims, observed=True, sort=False)['monto_cancelado'].sum().reset_index()
             
             df_portfolio = df_portfolio.merge(payment_aggregated, on=portfolio_dims, how='left')
             df_portfolio['monto_cancelado'] = df_portfolio['monto_cancelado'].fillna(0)
@@ -0,0 +1,39 @@
+"""
+Shared pytest fixtures for FACO ETL tests
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+# Add src to path once for every test module
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from core.config import ETLConfig
+from etl.business_days import BusinessDaysProcessor
+from etl.transformer import CobranzaTransformer
+
+
+@pytest.fixture(scope="session")
+def etl_config():
+    """Test configuration shared by the whole session (treated as read-only)"""
+    return ETLConfig(
+        project_id="test-project",
+        dataset_id="test_dataset",
+        mes_vigencia="2025-06",
+        estado_vigencia="abierto",
+        dry_run=True
+    )
+
+
+@pytest.fixture(scope="session")
+def business_days_processor(etl_config):
+    """Business days processor built once, so its holidays cache is reused across tests"""
+    return BusinessDaysProcessor(etl_config)
+
+
+@pytest.fixture(scope="session")
+def transformer(etl_config, business_days_processor):
+    """Transformer built once on top of the shared processor"""
+    return CobranzaTransformer(etl_config, business_days_processor)
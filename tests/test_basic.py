@@ -10,7 +10,7 @@ from datetime import datetime, date
 import sys
 from pathlib import Path
 
-# Add src to path for imports
+# Add src to path for imports (conftest.py does it under pytest; kept for direct runs)
 sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
 
 from core.config import ETLConfig
@@ -21,15 +21,12 @@ from etl.transformer import CobranzaTransformer
 class TestETLComponents:
     """Test core ETL components functionality"""
     
-    def setup_method(self):
-        """Setup test configuration"""
-        self.config = ETLConfig(
-            project_id="test-project",
-            dataset_id="test_dataset", 
-            mes_vigencia="2025-06",
-            estado_vigencia="abierto",
-            dry_run=True
-        )
+    @pytest.fixture(autouse=True)
+    def _inject_components(self, etl_config, business_days_processor, transformer):
+        """Use the session-wide configuration, processor and transformer"""
+        self.config = etl_config
+        self.processor = business_days_processor
+        self.transformer = transformer
     
     def test_config_validation(self):
         """Test configuration validation"""
@@ -51,7 +48,7 @@ class TestETLComponents:
     
     def test_business_days_processor(self):
         """Test business days calculations"""
-        processor = BusinessDaysProcessor(self.config)
+        processor = self.processor
         
         # Test known dates
         test_date = date(2025, 6, 19)  # Thursday
@@ -72,7 +69,7 @@ class TestETLComponents:
     
     def test_business_days_dataframe_integration(self):
         """Test business days integration with DataFrame"""
-        processor = BusinessDaysProcessor(self.config)
+        processor = self.processor
         
         # Create test DataFrame
         test_df = pd.DataFrame({
@@ -104,8 +101,7 @@ class TestETLComponents:
     
     def test_transformer_dimension_creation(self):
         """Test transformer dimension creation logic"""
-        processor = BusinessDaysProcessor(self.config)
-        transformer = CobranzaTransformer(self.config, processor)
+        transformer = self.transformer
         
         # Test cartera type extraction
         test_cases = [
@@ -115,14 +111,13 @@ class TestETLComponents:
             ("Other_File_Name.txt", "OTRAS")
         ]
         
-        for filename, expected_cartera in test_cases:
-            result = transformer._extract_cartera_type(filename)
+        results = transformer._extract_cartera_types(pd.Series([filename for filename, _ in test_cases]))
+        for (filename, expected_cartera), result in zip(test_cases, results):
             assert result == expected_cartera, f"Failed for {filename}: expected {expected_cartera}, got {result}"
     
     def test_transformer_recovery_objective(self):
         """Test recovery objective calculation"""
-        processor = BusinessDaysProcessor(self.config)
-        transformer = CobranzaTransformer(self.config, processor)
+        transformer = self.transformer
         
         test_cases = [
             ("AL VCTO", 0.15),
@@ -136,43 +131,103 @@ class TestETLComponents:
             result = transformer._calculate_recovery_objective(tramo)
             assert result == expected_obj, f"Failed for {tramo}: expected {expected_obj}, got {result}"
     
+    def test_transformer_management_segment(self):
+        """Test vectorized management segment creation"""
+        transformer = self.transformer
+        
+        test_df = pd.DataFrame({
+            'tramo_gestion': ['AL VCTO', 'TEMPRANA', None, None],
+            'fraccionamiento': ['SI', 'NO', 'SI', None],
+            'cuota_fracc_act': ['3', '  ', None, None]
+        })
+        
+        result = transformer._create_management_segment_safe(test_df)
+        assert list(result) == [
+            'AL VCTO - FRACCIONADO - CUOTA_3',
+            'TEMPRANA',
+            ' - FRACCIONADO',
+            'NO_ESPECIFICADO'
+        ]
+    
     def test_transformer_first_time_tracking(self):
-        """Test first-time tracking logic"""
-        processor = BusinessDaysProcessor(self.config)
-        transformer = CobranzaTransformer(self.config, processor)
+        """Test first-time flags with date ties and clients spread over several carteras, canales and operadores"""
+        transformer = self.transformer
         
-        # Create test data with multiple interactions per client
         test_df = pd.DataFrame({
-            'cliente': [1, 1, 2, 2, 1],
-            'CARTERA': ['A', 'A', 'B', 'B', 'A'],
-            'CANAL': ['BOT', 'BOT', 'HUMANO', 'HUMANO', 'BOT'],
+            'cliente': [1, 1, 1, 1, 2, 2],
+            'CARTERA': ['A', 'A', 'B', 'A', 'A', 'A'],
+            'CANAL': ['BOT', 'BOT', 'BOT', 'HUMANO', 'BOT', 'BOT'],
+            'OPERADOR': ['op1', 'op2', 'op1', 'op1', 'op1', 'op1'],
+            'GRUPO_RESPUESTA': ['CE', 'NC', 'CE', 'CE', 'NC', 'NC'],
+            # Filas 0, 1 y 4 empatan en la hora: el orden estable conserva el de entrada
             'date': pd.to_datetime([
                 '2025-06-19 10:00:00',
-                '2025-06-19 14:00:00', 
+                '2025-06-19 10:00:00',
+                '2025-06-19 09:00:00',
                 '2025-06-19 11:00:00',
-                '2025-06-20 09:00:00',
-                '2025-06-20 15:00:00'
+                '2025-06-19 10:00:00',
+                '2025-06-19 12:00:00'
             ]),
-            'management': ['CONTACTO_EFECTIVO', 'NO_CONTESTA', 'CONTACTO_EFECTIVO', 'CONTACTO_EFECTIVO', 'CONTACTO_EFECTIVO']
+            'es_contacto_efectivo': [True, False, True, True, False, True]
         })
         
-        # Apply first-time tracking
-        result_df = transformer._add_first_time_tracking(test_df, ['cliente', 'CARTERA', 'CANAL'])
+        result_df = transformer._mark_first_effective_contact(
+            transformer._mark_first_time_interactions(test_df)
+        ).sort_index()
         
-        # Validate first-time flags
-        assert 'es_primera_vez' in result_df.columns
-        assert 'es_primer_contacto_efectivo' in result_df.columns
+        assert result_df['_primera_vez_bits'].dtype == 'uint8'
+        expected_flags = {
+            ('cliente', 'CARTERA', 'CANAL'): [True, False, True, True, True, False],
+            ('cliente', 'CARTERA', 'CANAL', 'OPERADOR'): [True, True, True, True, True, False],
+            ('cliente', 'CANAL'): [False, False, True, True, True, False],
+            ('cliente', 'GRUPO_RESPUESTA'): [False, True, True, False, True, False],
+            ('cliente',): [False, False, True, False, True, False],
+        }
+        assert [tuple(dims) for dims in transformer.FIRST_TIME_DIMENSIONS] == list(expected_flags)
+        for dims, expected in expected_flags.items():
+            assert list(transformer._first_time_flag(result_df, list(dims))) == expected, dims
         
-        # Check that first interactions are marked correctly
-        # First BOT interaction for client 1 in cartera A should be marked as first
-        first_interaction_mask = (
-            (result_df['cliente'] == 1) & 
-            (result_df['CARTERA'] == 'A') & 
-            (result_df['CANAL'] == 'BOT')
-        )
-        first_interactions = result_df[first_interaction_mask].sort_values('date')
-        assert first_interactions.iloc[0]['es_primera_vez'] == True
-        assert first_interactions.iloc[1]['es_primera_vez'] == False
+        # First effective contact per client: row 2 for client 1 (earliest), row 5 for client 2
+        assert list(result_df['es_primer_contacto_efectivo']) == [False, False, True, False, False, True]
+    
+    @pytest.mark.parametrize('dropna', [True, False])
+    @pytest.mark.parametrize('sort', [True, False])
+    def test_grouped_nunique_matches_pandas(self, dropna, sort):
+        """_grouped_nunique agrees with groupby().nunique(), with NA keys and NA values"""
+        test_df = pd.DataFrame({
+            'CARTERA': pd.Categorical(['A', 'B', None, 'A', 'B', None, 'A', 'C']),
+            'CANAL': ['BOT', 'BOT', 'BOT', 'HUMANO', 'BOT', 'BOT', 'BOT', None],
+            'cliente': pd.array([1, 2, 3, None, 2, 3, None, None], dtype='Int64'),
+        })
+        
+        grouped = test_df.groupby(['CARTERA', 'CANAL'], observed=True, sort=sort, dropna=dropna)
+        result = CobranzaTransformer._grouped_nunique(grouped, test_df['cliente'])
+        
+        assert list(result) == grouped['cliente'].nunique().tolist()
+    
+    def test_period_comparisons_join_previous_month(self):
+        """Each row gets the same business day of the previous month; dates without one are dropped"""
+        transformer = self.transformer
+        
+        test_df = pd.DataFrame({
+            'FECHA_SERVICIO': pd.to_datetime(['2025-06-19', '2025-03-31', '2025-06-22', '2025-06-19']),
+            'CARTERA': ['A', 'A', 'A', 'B'],
+            'total_interacciones': [1, 2, 3, 4],
+        })
+        
+        result_df = transformer.create_period_comparisons(test_df).sort_values('total_interacciones')
+        
+        # 22/06/2025 es domingo: sin día hábil equivalente en mayo, la fila no se compara
+        assert list(result_df['total_interacciones']) == [1, 2, 4]
+        assert list(result_df['CARTERA']) == ['A', 'A', 'B']
+        assert list(result_df['fecha_actual']) == [date(2025, 6, 19), date(2025, 3, 31), date(2025, 6, 19)]
+        # El 31/03 supera los días hábiles de febrero: se compara con el último (28/02)
+        june_19 = self.processor.get_same_business_day_previous_month(date(2025, 6, 19))
+        assert list(result_df['fecha_comparacion']) == [june_19, date(2025, 2, 28), june_19]
+        assert list(result_df['dia_habil_numero']) == [
+            self.processor.calculate_business_day_of_month(day) for day in result_df['fecha_actual']
+        ]
+        assert result_df['puede_comparar'].all()
     
     def test_mock_data_creation(self):
         """Test mock data creation for testing without BigQuery"""
@@ -198,8 +253,7 @@ class TestETLComponents:
         })
         
         # Test dimension creation
-        processor = BusinessDaysProcessor(self.config)
-        transformer = CobranzaTransformer(self.config, processor)
+        transformer = self.transformer
         
         base_dimensions = transformer._create_base_dimensions(mock_asignacion, mock_calendario)
         
@@ -232,6 +286,29 @@ def test_configuration_output_tables():
     assert config.output_tables == expected_tables
 
 
+def test_get_config_copies_do_not_share_state(monkeypatch):
+    """get_config() copies are independent and reset_config() re-reads the environment"""
+    from core.config import get_config, reset_config
+    
+    monkeypatch.setenv("CLUSTERING_FIELDS", "agregada:CARTERA,CANAL")
+    reset_config()
+    try:
+        first, second = get_config(), get_config()
+        assert first.clustering_fields['agregada'] == ('CARTERA', 'CANAL')
+        # Las copias superficiales comparten clustering_fields: debe ser de solo lectura
+        with pytest.raises(TypeError):
+            first.clustering_fields['agregada'] = ('CANAL',)
+        first.dry_run = not second.dry_run
+        assert get_config().dry_run == second.dry_run
+        
+        monkeypatch.setenv("CLUSTERING_FIELDS", "primera_vez:CARTERA,cliente")
+        assert 'agregada' in get_config().clustering_fields
+        reset_config()
+        assert dict(get_config().clustering_fields) == {'primera_vez': ('CARTERA', 'cliente')}
+    finally:
+        reset_config()
+
+
 def test_business_days_validation():
     """Test business days validation logic"""
     config = ETLConfig(country_code="PE")
@@ -251,6 +328,106 @@ def test_business_days_validation():
         assert 'es_feriado' in result
 
 
+@pytest.fixture(scope="module", params=[False, True], ids=["sin_sabados", "con_sabados"])
+def processor_by_saturdays(request, etl_config):
+    """Business days processor for each INCLUDE_SATURDAYS setting"""
+    import copy
+    config = copy.copy(etl_config)
+    config.include_saturdays = request.param
+    return BusinessDaysProcessor(config)
+
+
+def _scalar_business_day_number(processor, day):
+    """Business day number counted day by day with the scalar is_business_day()"""
+    if not processor.is_business_day(day):
+        return 0
+    return sum(processor.is_business_day(day.replace(day=d)) for d in range(1, day.day + 1))
+
+
+def test_business_day_tables_exclude_holidays(processor_by_saturdays):
+    """Holidays are never business days and do not advance the business day count"""
+    processor = processor_by_saturdays
+    # 28 y 29 de julio de 2025 (lunes y martes): Fiestas Patrias; 18 de abril: Viernes Santo
+    holidays_2025 = [date(2025, 7, 28), date(2025, 7, 29), date(2025, 4, 18)]
+    
+    assert not processor.is_business_days(holidays_2025).any()
+    assert list(processor.calculate_business_days_of_month(holidays_2025)) == [0, 0, 0]
+    # 19 días hábiles de lunes a viernes hasta el 25/07 (+4 sábados); el 30/07 es el siguiente
+    expected = 24 if processor.include_saturdays else 20
+    assert processor.calculate_business_day_of_month(date(2025, 7, 30)) == expected
+
+
+def test_business_day_tables_saturday_setting(processor_by_saturdays):
+    """Saturdays count as business days only with INCLUDE_SATURDAYS; Sundays never do"""
+    processor = processor_by_saturdays
+    saturday, sunday, monday = date(2025, 6, 21), date(2025, 6, 22), date(2025, 6, 23)
+    
+    assert list(processor.is_business_days([saturday, sunday, monday])) == [processor.include_saturdays, False, True]
+    # 15 días de lunes a viernes hasta el 20/06 (+2 sábados: 7 y 14)
+    expected = [18, 0, 19] if processor.include_saturdays else [0, 0, 16]
+    assert list(processor.calculate_business_days_of_month([saturday, sunday, monday])) == expected
+
+
+def test_last_day_maps_to_previous_month_last_business_day(processor_by_saturdays):
+    """A business day number beyond the previous month's count maps to its last business day"""
+    processor = processor_by_saturdays
+    # Marzo 2025 tiene más días hábiles que febrero: el 31/03 cae fuera de febrero
+    assert processor.calculate_business_day_of_month(date(2025, 3, 31)) > len(
+        processor.get_business_days_in_month(2025, 2)
+    )
+    assert processor.get_same_business_day_previous_month(date(2025, 3, 31)) == date(2025, 2, 28)
+    assert processor.get_same_business_day_previous_month(date(2025, 3, 31)) == (
+        processor.get_last_business_day_of_month(2025, 2)
+    )
+
+
+def test_business_day_tables_agree_with_scalar_over_a_year(processor_by_saturdays):
+    """Vectorized business day numbers and previous-month matches agree with the scalar helpers for 2025"""
+    processor = processor_by_saturdays
+    days = pd.date_range('2025-01-01', '2025-12-31')
+    previous_days = pd.date_range('2024-12-01', '2025-11-30')
+    numbers = processor.calculate_business_days_of_month(days)
+    
+    business_days_by_month = {}
+    for day, number in zip(previous_days, processor.calculate_business_days_of_month(previous_days)):
+        if number:
+            business_days_by_month.setdefault((day.year, day.month), []).append(day.date())
+    
+    for day, number in zip(days, numbers):
+        day = day.date()
+        assert number == _scalar_business_day_number(processor, day), day
+        expected = None
+        if number:
+            previous = business_days_by_month[(day.year - 1, 12) if day.month == 1 else (day.year, day.month - 1)]
+            expected = previous[min(number, len(previous)) - 1]
+        assert processor.get_same_business_day_previous_month(day) == expected, day
+
+
+@pytest.mark.parametrize('query_name', ['get_gestiones_bot', 'get_gestiones_humano'])
+def test_gestiones_shards_cover_every_cod_luna(query_name):
+    """Every cod_luna, negative ones included, falls in exactly one GESTIONES_SHARDS shard"""
+    import math
+    import re
+    from etl.queries import QUERIES
+    
+    predicate = re.search(r"WHERE (MOD\(.*\) = @shard)", QUERIES[query_name]).group(1)
+    # Semántica de BigQuery: MOD conserva el signo del dividendo, como math.fmod
+    expression = (
+        predicate.replace('MOD', 'bq_mod').replace('ABS', 'abs').replace('g.cod_luna', 'cod_luna')
+        .replace('@n_shards', 'n_shards').replace('@shard', 'shard').replace(' = ', ' == ')
+    )
+    bq_mod = lambda x, y: int(math.fmod(x, y))
+    
+    for n_shards in (1, 3, 4):
+        for cod_luna in range(-10, 11):
+            matches = [
+                shard for shard in range(n_shards)
+                if eval(expression, {'bq_mod': bq_mod, 'abs': abs},
+                        {'cod_luna': cod_luna, 'n_shards': n_shards, 'shard': shard})
+            ]
+            assert len(matches) == 1, (cod_luna, n_shards, matches)
+
+
 if __name__ == "__main__":
     # Run basic tests without pytest
     print("🧪 Ejecutando tests básicos de FACO ETL...")
@@ -284,7 +461,9 @@ if __name__ == "__main__":
         transformer = CobranzaTransformer(config, processor)
         
         # Test cartera extraction
-        cartera = transformer._extract_cartera_type("Cartera_Agencia_Cobranding_Gestion_Temprana_20250617.txt")
+        cartera = transformer._extract_cartera_types(
+            pd.Series(["Cartera_Agencia_Cobranding_Gestion_Temprana_20250617.txt"])
+        ).iat[0]
         assert cartera == "TEMPRANA"
         
         # Test recovery objective
@@ -0,0 +1,282 @@
+"""
+Tests for the BigQuery loaders with a mocked BigQuery client
+"""
+
+import copy
+from datetime import date
+from unittest.mock import MagicMock, patch
+
+import pandas as pd
+import pyarrow as pa
+import pytest
+
+from google.api_core.exceptions import NotFound
+
+from etl.loader import BigQueryLoader, StorageWriteLoader
+
+
+@pytest.fixture
+def make_loader(etl_config):
+    """Builds a loader on a copy of the session config, with bigquery.Client mocked"""
+    def _make(loader_cls=BigQueryLoader, **overrides) -> BigQueryLoader:
+        config = copy.copy(etl_config)
+        config.dry_run = False
+        for key, value in overrides.items():
+            setattr(config, key, value)
+        with patch('etl.loader.bigquery.Client') as client_cls, \
+                patch('google.cloud.bigquery_storage_v1', MagicMock(), create=True):
+            loader = loader_cls(config)
+        job = MagicMock(output_rows=1, output_bytes=0, started=None, ended=None, schema=[])
+        client_cls.return_value.load_table_from_file.return_value = job
+        client_cls.return_value.list_jobs.return_value = []
+        client_cls.return_value.get_table.side_effect = NotFound('table')
+        return loader
+    return _make
+
+
+def _base_cartera_shard(servicios, totals) -> pd.DataFrame:
+    """base_cartera shard for one file, all on the same assignment date"""
+    return pd.DataFrame({
+        'CARTERA': ['AL VCTO'] * len(servicios),
+        'FECHA_ASIGNACION': [date(2025, 6, 1)] * len(servicios),
+        'SERVICIO': servicios,
+        'MOVIL_FIJA': ['MOVIL'] * len(servicios),
+        'total_cod_lunas': totals,
+    })
+
+
+def _merge_scripts(loader: BigQueryLoader):
+    return [c.args[0] for c in loader.client.query.call_args_list if 'MERGE' in c.args[0]]
+
+
+def test_merge_rejects_keys_repeated_across_files(make_loader):
+    """Two files sharing a natural key must not be merged with one of them silently dropped"""
+    loader = make_loader(write_strategy='merge', overwrite_tables=True)
+    loader.stage_dataframe(_base_cartera_shard(['MOVIL', None], [10, 20]), 'base_cartera')
+    loader.stage_dataframe(_base_cartera_shard(['FIJA', None], [30, 40]), 'base_cartera')
+
+    result = loader.flush(write_disposition='WRITE_APPEND')['base_cartera']
+
+    assert result['status'] == 'ERROR'
+    assert 'clave natural' in result['error']
+    assert not _merge_scripts(loader)
+
+
+def test_merge_rejects_keys_merged_earlier_in_the_run(make_loader):
+    """A key already merged by an earlier load in the run is a collision too"""
+    loader = make_loader(write_strategy='merge', overwrite_tables=True)
+
+    first = loader.load_dataframe_to_table(_base_cartera_shard(['MOVIL'], [10]), 'base_cartera', 'WRITE_APPEND')
+    second = loader.load_dataframe_to_table(_base_cartera_shard(['MOVIL'], [30]), 'base_cartera', 'WRITE_APPEND')
+
+    assert first['status'] == 'SUCCESS'
+    assert second['status'] == 'ERROR'
+    assert len(_merge_scripts(loader)) == 1
+
+
+def test_merge_inserts_explicit_columns(make_loader):
+    """The MERGE inserts an explicit column list rather than INSERT ROW"""
+    loader = make_loader(write_strategy='merge', overwrite_tables=True)
+    df = _base_cartera_shard(['MOVIL', 'FIJA'], [10, 20])
+
+    result = loader.load_dataframe_to_table(df, 'base_cartera', 'WRITE_APPEND')
+
+    assert result['status'] == 'SUCCESS'
+    (script,) = _merge_scripts(loader)
+    assert 'INSERT ROW' not in script
+    assert 'INSERT (' + ', '.join(f"`{col}`" for col in df.columns) + ')' in script
+
+
+def _agregada_shard(days) -> pd.DataFrame:
+    """Minimal agregada shard with one row per service date"""
+    return pd.DataFrame({
+        'FECHA_SERVICIO': [date(2025, 6, day) for day in days],
+        'CARTERA': ['AL VCTO'] * len(days),
+        'CANAL': ['BOT'] * len(days),
+        'total_gestiones': list(range(len(days))),
+    })
+
+
+def _submitted_loads(loader: BigQueryLoader):
+    """(table_id, write_disposition) of every load job submitted to the mocked client"""
+    return [
+        (c.args[1], c.kwargs['job_config'].write_disposition)
+        for c in loader.client.load_table_from_file.call_args_list
+    ]
+
+
+@pytest.mark.parametrize('drop_partition', [False, True])
+def test_partition_truncate_never_truncates_whole_table(make_loader, drop_partition):
+    """WRITE_TRUNCATE only ever reaches BigQuery on a $YYYYMMDD decorator"""
+    loader = make_loader(write_strategy='partition_truncate', overwrite_tables=True)
+    df = _agregada_shard([2, 3])
+    if drop_partition:
+        df = df.drop(columns='FECHA_SERVICIO')
+
+    result = loader.load_dataframe_to_table(df, 'agregada', 'WRITE_TRUNCATE')
+
+    truncated = [table_id for table_id, disposition in _submitted_loads(loader) if disposition == 'WRITE_TRUNCATE']
+    assert all('$' in table_id for table_id in truncated)
+    if drop_partition:
+        assert result['status'] == 'ERROR'
+        assert not truncated
+    else:
+        assert result['status'] == 'SUCCESS'
+        assert sorted(table_id.split('$')[1] for table_id in truncated) == ['20250602', '20250603']
+
+
+def test_bounded_flushes_keep_earlier_partitions(make_loader):
+    """Staging fills at STAGING_MAX_ROWS and a later flush appends to the days an earlier one replaced"""
+    loader = make_loader(write_strategy='partition_truncate', overwrite_tables=True, staging_max_rows=2)
+
+    loader.stage_dataframe(_agregada_shard([2]), 'agregada')
+    assert not loader.staging_full()
+    loader.stage_dataframe(_agregada_shard([3]), 'agregada')
+    assert loader.staging_full()
+    first = loader.flush(write_disposition='WRITE_TRUNCATE')
+    assert not loader.staging_full()
+
+    loader.stage_dataframe(_agregada_shard([3, 4]), 'agregada')
+    second = loader.flush(write_disposition='WRITE_TRUNCATE')
+
+    assert first['agregada']['status'] == second['agregada']['status'] == 'SUCCESS'
+    table_id = loader._table_ids['agregada']
+    assert sorted(_submitted_loads(loader)) == [
+        (f'{table_id}$20250602', 'WRITE_TRUNCATE'),
+        (f'{table_id}$20250603', 'WRITE_APPEND'),
+        (f'{table_id}$20250603', 'WRITE_TRUNCATE'),
+        (f'{table_id}$20250604', 'WRITE_TRUNCATE'),
+    ]
+
+
+@pytest.fixture
+def storage_loader(make_loader):
+    """StorageWriteLoader with the write client mocked: every stream is named 'stream-N'"""
+    loader = make_loader(StorageWriteLoader, write_strategy='delete_append', overwrite_tables=True)
+    write_client = loader._write_client
+    streams = [MagicMock() for _ in range(10)]
+    for i, stream in enumerate(streams):
+        stream.name = f'stream-{i}'
+    write_client.create_write_stream.side_effect = streams
+    write_client.table_path.side_effect = lambda project, dataset, table: f'{project}/{dataset}/{table}'
+    loader._storage.types.BatchCommitWriteStreamsRequest.side_effect = lambda **request: request
+    write_client.batch_commit_write_streams.return_value = MagicMock(stream_errors=[])
+    return loader
+
+
+def _committed_streams(loader: StorageWriteLoader):
+    """write_streams of every BatchCommitWriteStreamsRequest built by the loader"""
+    return [c.args[0]['write_streams'] for c in loader._write_client.batch_commit_write_streams.call_args_list]
+
+
+def test_storage_write_commits_streams_on_flush(storage_loader):
+    """Appends stay pending until flush() commits every finalized stream of the table together"""
+    storage_loader.stage_dataframe(_agregada_shard([2, 3]), 'agregada')
+    storage_loader.stage_dataframe(_agregada_shard([4]), 'agregada')
+
+    results = storage_loader.flush(write_disposition='WRITE_APPEND')
+
+    assert results['agregada'] == {'status': 'SUCCESS', 'rows_written': 3}
+    storage_loader._write_client.finalize_write_stream.assert_called_once_with(name='stream-0')
+    assert _committed_streams(storage_loader) == [['stream-0']]
+    assert not storage_loader.client.load_table_from_file.called
+
+
+def test_storage_write_partial_append_is_not_committed(storage_loader, monkeypatch):
+    """A stream whose append fails midway is neither finalized nor committed"""
+    monkeypatch.setattr('etl.loader.STORAGE_WRITE_BATCH_ROWS', 1)
+    append_rows_stream = storage_loader._storage.writer.AppendRowsStream.return_value
+    append_rows_stream.send.return_value.result.side_effect = [None, RuntimeError('append failed'), None]
+
+    result = storage_loader.load_dataframe_to_table(_agregada_shard([2, 3, 4]), 'agregada', 'WRITE_APPEND')
+    results = storage_loader.flush(write_disposition='WRITE_APPEND')
+
+    assert result['status'] == 'ERROR'
+    assert result['rows_written'] == 0
+    assert results == {}
+    append_rows_stream.close.assert_called_once()
+    assert not storage_loader._write_client.finalize_write_stream.called
+    assert not storage_loader._write_client.batch_commit_write_streams.called
+
+
+def test_storage_write_rows_written_accounting(storage_loader):
+    """rows_written counts appended rows per table, and drops to 0 when the table's commit fails"""
+    write_client = storage_loader._write_client
+    # Las tablas se cargan en paralelo: el error se decide por tabla, no por orden de llamada
+    write_client.batch_commit_write_streams.side_effect = lambda request: MagicMock(
+        stream_errors=[MagicMock(error_message='stream expired')] if 'base_cartera' in request['parent'] else []
+    )
+    storage_loader.stage_dataframe(_agregada_shard([2, 3, 4]), 'agregada')
+    storage_loader.stage_dataframe(_base_cartera_shard(['MOVIL', 'FIJA'], [10, 20]), 'base_cartera')
+
+    results = storage_loader.flush(write_disposition='WRITE_APPEND')
+
+    assert results['agregada'] == {'status': 'SUCCESS', 'rows_written': 3}
+    assert results['base_cartera']['status'] == 'ERROR'
+    assert results['base_cartera']['rows_written'] == 0
+    assert 'stream expired' in results['base_cartera']['error']
+
+
+def test_optimize_dtypes_keeps_keys_and_floats(make_loader):
+    """Only non-key integers are downcast; key/clustering integers and whole-valued floats keep their type"""
+    loader = make_loader()
+    df = pd.DataFrame({
+        'FECHA_SERVICIO': pd.to_datetime(['2025-06-02', '2025-06-03']),
+        'cliente': pd.Series([1, 2], dtype='int64'),
+        'CARTERA': ['AL VCTO', 'AL VCTO'],
+        'total_gestiones': pd.Series([3, 4], dtype='int64'),
+        'tasa_contacto': [1.0, 0.0],
+    })
+
+    arrow_table, schema, _ = loader._prepare_arrow_table(loader._optimize_dtypes(df, 'primera_vez'), 'primera_vez')
+    field_types = {f.name: f.field_type for f in schema}
+
+    assert arrow_table.schema.field('cliente').type == pa.int64()
+    assert arrow_table.schema.field('total_gestiones').type == pa.int8()
+    assert arrow_table.schema.field('tasa_contacto').type == pa.float64()
+    assert field_types['cliente'] == 'INTEGER'
+    assert field_types['tasa_contacto'] == 'FLOAT'
+
+
+def test_categorical_fecha_servicio_loads_as_date(make_loader):
+    """A categorical datetime FECHA_SERVICIO outside the partition column is still loaded as DATE"""
+    loader = make_loader()
+    df = pd.DataFrame({
+        'fecha_actual': pd.to_datetime(['2025-06-02', '2025-06-03']),
+        'FECHA_SERVICIO': pd.Categorical(pd.to_datetime(['2025-06-02', '2025-06-02'])),
+        'CARTERA': ['AL VCTO', 'TEMPRANA'],
+    })
+
+    arrow_table, schema, _ = loader._prepare_arrow_table(loader._optimize_dtypes(df, 'comparativas'), 'comparativas')
+
+    assert {f.name: f.field_type for f in schema}['FECHA_SERVICIO'] == 'DATE'
+    assert arrow_table.column('FECHA_SERVICIO').to_pylist() == [date(2025, 6, 2)] * 2
+
+
+def test_optimize_dtypes_empty_shard(make_loader):
+    """A zero-row shard is prepared without dividing by zero"""
+    loader = make_loader()
+    df = pd.DataFrame({
+        'FECHA_SERVICIO': pd.Series([], dtype='datetime64[ns]'),
+        'CARTERA': pd.Series([], dtype=object),
+        'total_gestiones': pd.Series([], dtype='int64'),
+    })
+
+    optimized = loader._optimize_dtypes(df, 'agregada')
+
+    assert len(optimized.index) == 0
+    assert list(optimized.columns) == list(df.columns)
+
+
+def test_table_descriptions_check_existence_first(make_loader):
+    """A table missing from INFORMATION_SCHEMA.TABLES is reported as MISSING, never compared and altered"""
+    loader = make_loader()
+    loader.client.query.return_value.result.return_value = []
+
+    loader.create_table_descriptions()
+
+    (script,) = [c.args[0] for c in loader.client.query.call_args_list]
+    for table_name in loader.output_tables.values():
+        block = script[script.index(f"WHERE table_name = '{table_name}'"):]
+        # La comprobación de existencia precede a la comparación con TABLE_OPTIONS
+        assert block.index("'MISSING' AS status") < block.index('TABLE_OPTIONS') < block.index('ALTER TABLE')
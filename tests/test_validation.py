@@ -2,6 +2,8 @@
 Quick validation test for FACO ETL setup
 """
 
+import pytest
+
 def test_imports():
     """Test that all imports work correctly"""
     try:
@@ -61,15 +63,11 @@ def test_orchestrator():
         return False
 
 
+@pytest.mark.xdist_group("serial")
 def test_dry_run():
     """Test a dry run of the ETL process"""
     try:
-        import sys
-        from pathlib import Path
-        
-        # Add src to path
-        sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
-        
+        # src is put on sys.path once by conftest.py
         from core.config import get_config
         from core.orchestrator import ETLOrchestrator
         from core.logger import setup_logging